@@ -0,0 +1,90 @@
+"""
+Benchmark the bounded fuzzy name search against the original SequenceMatcher
+full scan over every medicine name. Both must return the same results.
+
+Usage:
+    MEDICINES_DATA_PATH=/path/to/medicines.json python benchmarks/fuzzy_search.py [--queries 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402  (loads the catalogue from MEDICINES_DATA_PATH)
+
+names = list(server.catalogue.name_index.keys)
+
+
+def full_scan(query: str, threshold: float):
+    """The pre-index implementation: score every name."""
+    scored = []
+    for med_name in names:
+        score = server.similarity_score(query, med_name)
+        if score >= threshold:
+            scored.append((score, med_name))
+    scored.sort(reverse=True, key=lambda x: x[0])
+    return scored
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    """Apply one random substitution, deletion or transposition."""
+    if len(name) < 4:
+        return name
+    i = rng.randrange(1, len(name) - 1)
+    edit = rng.choice(("substitute", "delete", "transpose"))
+    if edit == "substitute":
+        return name[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + name[i + 1:]
+    if edit == "delete":
+        return name[:i] + name[i + 1:]
+    return name[:i - 1] + name[i] + name[i - 1] + name[i + 1:]
+
+
+def timed(fn, queries):
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(fn(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, results
+
+
+def summarize(label: str, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{label:<12} mean {statistics.mean(latencies):8.3f} ms   "
+          f"p50 {statistics.median(latencies):8.3f} ms   p95 {p95:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200, help="Number of misspelled names to look up")
+    parser.add_argument("--threshold", type=float, default=0.6, help="Similarity threshold (fuzzy_search_by_name default)")
+    parser.add_argument("--top", type=int, default=10, help="Results compared per query (fuzzy_search_by_name default)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    queries = [misspell(rng.choice(names), rng) for _ in range(args.queries)]
+
+    print(f"{len(names)} names, {len(queries)} queries, threshold {args.threshold}")
+    scan_latencies, scan_results = timed(lambda q: full_scan(q, args.threshold), queries)
+    index_latencies, index_results = timed(
+        lambda q: server.catalogue.fuzzy_name_matches(q, args.threshold, limit=args.top), queries
+    )
+    summarize("full scan", scan_latencies)
+    summarize("bounded", index_latencies)
+    print(f"speed-up     {statistics.mean(scan_latencies) / statistics.mean(index_latencies):.1f}x (mean)")
+
+    # Agreement of the returned top results and of the single best match
+    same_top = sum(a[:args.top] == b[:args.top] for a, b in zip(scan_results, index_results))
+    same_best = sum(a[:1] == b[:1] for a, b in zip(scan_results, index_results))
+    print(f"identical top-{args.top}: {same_top}/{len(queries)}   identical best match: {same_best}/{len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
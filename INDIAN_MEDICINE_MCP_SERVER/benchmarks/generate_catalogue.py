@@ -0,0 +1,125 @@
+"""
+Generate a synthetic medicines.json with realistic Name, Manufacturer,
+Composition, MRP and Prescription distributions, for benchmarks at any scale.
+
+Manufacturers and ingredients follow skewed (Zipf-like) frequencies, most
+medicines have one active ingredient and some have two or three, prices are
+log-normal, and a small share of records repeat a name or lack a field, as in
+the real catalogue.
+
+Usage:
+    python benchmarks/generate_catalogue.py --records 100k --output /tmp/medicines-100k.json [--seed 42]
+"""
+import argparse
+import itertools
+import json
+import math
+import random
+
+COMMON_INGREDIENTS = [
+    "Paracetamol", "Amoxycillin", "Clavulanic Acid", "Azithromycin", "Cetirizine", "Levocetirizine",
+    "Montelukast", "Pantoprazole", "Omeprazole", "Rabeprazole", "Domperidone", "Ondansetron",
+    "Metformin", "Glimepiride", "Atorvastatin", "Rosuvastatin", "Amlodipine", "Telmisartan",
+    "Losartan", "Metoprolol", "Ibuprofen", "Diclofenac", "Aceclofenac", "Tramadol",
+    "Ambroxol", "Levosalbutamol", "Guaifenesin", "Dextromethorphan", "Chlorpheniramine",
+    "Phenylephrine", "Ofloxacin", "Ciprofloxacin", "Cefixime", "Cefpodoxime", "Doxycycline",
+    "Fluconazole", "Clotrimazole", "Mupirocin", "Betamethasone", "Vitamin D3", "Folic Acid",
+    "Methylcobalamin", "Calcium Carbonate", "Ferrous Ascorbate", "Zinc", "Multivitamin",
+]
+SYLLABLES = ["ra", "zo", "lin", "vo", "pi", "ce", "ta", "mox", "dol", "fen", "pra", "zol", "ti", "na",
+             "vir", "lo", "sar", "ex", "ri", "qu", "bo", "dex", "mi", "cal", "ne", "ru", "so", "fa"]
+STRENGTHS = ["5mg", "10mg", "20mg", "25mg", "40mg", "50mg", "100mg", "150mg", "250mg", "500mg", "650mg",
+             "1000mg", "1mg/5ml", "2mg/5ml", "30mg/5ml", "125mg/5ml", "250mg/5ml", "0.1% w/w", "1% w/w",
+             "2% w/v", "60000 IU", "1500mcg"]
+FORMS = ["Tablet", "Capsule", "Syrup", "Injection", "Cream", "Suspension", "Drops", "Gel", "Ointment",
+         "Oral Suspension", "Inhaler", "Spray"]
+SUFFIXES = ["", "", "", "LS", "Plus", "DS", "Forte", "SR", "MR", "XL", "Kid", "Total"]
+COMPANY_TYPES = ["Pvt Ltd", "Pvt Ltd", "Ltd", "Laboratories", "Healthcare"]
+
+
+def parse_count(text: str) -> int:
+    """Parse a record count such as 10000, 10k, 100k or 1m."""
+    text = text.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * multiplier)
+
+
+def zipf_weights(count: int, exponent: float):
+    """Cumulative weights for rng.choices, rank i having weight 1 / (i + 1)^exponent."""
+    return list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+def coined_word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.choice((2, 2, 3)))).capitalize()
+
+
+def generate(records: int, seed: int):
+    """Yield `records` synthetic medicine dicts."""
+    rng = random.Random(seed)
+
+    manufacturers = [f"Pharma {i} {rng.choice(COMPANY_TYPES)}" for i in range(1, max(20, records // 100) + 1)]
+    manufacturer_weights = zipf_weights(len(manufacturers), 0.8)
+
+    # Real molecules first (the most common), then coined ones for the long tail
+    ingredients = list(COMMON_INGREDIENTS)
+    seen = set(ingredients)
+    while len(ingredients) < max(len(COMMON_INGREDIENTS), min(2000, records // 50)):
+        word = coined_word(rng) + rng.choice(("mide", "pril", "zole", "vir", "cin", "statin", "olol", "ine"))
+        if word not in seen:
+            seen.add(word)
+            ingredients.append(word)
+    ingredient_weights = zipf_weights(len(ingredients), 1.0)
+
+    names = []
+    for _ in range(records):
+        if names and rng.random() < 0.02:
+            # Some products share a name (different pack or manufacturer)
+            name = rng.choice(names)
+        else:
+            parts = [coined_word(rng), rng.choice(SUFFIXES)]
+            if rng.random() < 0.3:
+                parts.append(str(rng.choice((100, 250, 500, 650, 20, 40))))
+            parts.append(rng.choice(FORMS))
+            name = " ".join(part for part in parts if part)
+            names.append(name)
+
+        count = rng.choices((1, 2, 3), weights=(65, 25, 10))[0]
+        components = []
+        for ingredient in dict.fromkeys(rng.choices(ingredients, cum_weights=ingredient_weights, k=count)):
+            components.append(f"{ingredient} ({rng.choice(STRENGTHS)})")
+
+        entry = {"Name": name, "Manufacturer": rng.choices(manufacturers, cum_weights=manufacturer_weights)[0]}
+        if rng.random() >= 0.01:
+            entry["Composition"] = " + ".join(components)
+        roll = rng.random()
+        if roll >= 0.015:
+            entry["MRP"] = f"{min(5000.0, max(1.0, math.exp(rng.gauss(math.log(80), 1.0)))):.2f}"
+        elif roll >= 0.01:
+            entry["MRP"] = "N/A"
+        roll = rng.random()
+        if roll >= 0.01:
+            entry["Prescription"] = "Yes" if roll < 0.63 else "No"
+        yield entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", default="10k", help="Number of medicines, e.g. 10k, 100k, 1m")
+    parser.add_argument("--output", default="medicines.json", help="Path of the JSON file to write")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    records = parse_count(args.records)
+    # Written one record at a time so a 1m-record catalogue does not need to fit in memory twice
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for i, entry in enumerate(generate(records, args.seed)):
+            if i:
+                f.write(",\n")
+            f.write("  " + json.dumps(entry, ensure_ascii=False))
+        f.write("\n]\n")
+    print(f"Wrote {records} medicines to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Repeatable benchmarks of startup, index build and every MCP tool, written as
+JSON so runs can be compared across commits.
+
+Generate a catalogue of the size you care about first (see
+generate_catalogue.py). Queries are drawn from the catalogue with a fixed seed,
+so two runs over the same file exercise exactly the same calls. The result
+cache is disabled so every call measures the tool itself.
+
+Usage:
+    python benchmarks/generate_catalogue.py --records 100k --output /tmp/medicines-100k.json
+    python benchmarks/run_benchmarks.py --data /tmp/medicines-100k.json --output results.json [--baseline previous.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+    return {
+        "calls": len(ordered),
+        "mean_ms": round(statistics.mean(ordered), 4),
+        "p50_ms": round(statistics.median(ordered), 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        "max_ms": round(ordered[-1], 4),
+    }
+
+
+def timed_import(env, repeat: int):
+    """Wall-clock seconds for a fresh interpreter to `import server`."""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import server"], cwd=SERVER_DIR, env=env, check=True)
+        seconds.append(time.perf_counter() - start)
+    return round(min(seconds), 4)
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    """Replace one character, keeping the first so the name stays recognisable."""
+    if len(name) < 4:
+        return name
+    i = rng.randrange(1, len(name))
+    return name[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + name[i + 1:]
+
+
+def tool_cases(medicines, rng: random.Random, samples: int):
+    """Argument lists for every tool, drawn from the catalogue."""
+    names = [m["Name"] for m in rng.sample(medicines, samples) if m.get("Name")]
+    compositions = [m["Composition"] for m in rng.sample(medicines, samples) if m.get("Composition")]
+    ingredients = [c.split(" + ")[0].split(" (")[0] for c in compositions]
+    manufacturers = [m["Manufacturer"] for m in rng.sample(medicines, samples) if m.get("Manufacturer")]
+    prefixes = [name[:rng.randint(3, 6)] for name in names]
+    misspelled = [misspell(name, rng) for name in names]
+    prices = [(low, low * rng.choice((1.5, 2, 5))) for low in (rng.choice((1, 10, 50, 100, 500)) for _ in names)]
+    batches = [names[i:i + 20] for i in range(0, len(names), 20)]
+
+    return {
+        "get_medicine_by_name": [((n,), {}) for n in names] + [((n,), {}) for n in misspelled],
+        "search_medicines": [((q,), {}) for q in prefixes] + [((q,), {"max_results": 100}) for q in ingredients],
+        "fuzzy_search_by_name": [((q,), {}) for q in misspelled],
+        "search_by_composition": [((q,), {}) for q in ingredients],
+        "filter_by_price_range": [(p, {}) for p in prices],
+        "filter_by_manufacturer": [((m.split()[0] + " " + m.split()[-1],), {}) for m in manufacturers],
+        "filter_by_prescription_requirement": [((flag,), {"max_results": 100}) for flag in (True, False)],
+        "find_similar_medicines": [((n,), {}) for n in names] + [((n,), {"max_results": 50}) for n in names[:5]],
+        "get_medicine_statistics": [((), {})],
+        "paginated_search": (
+            [((q,), {"page": 2}) for q in prefixes]
+            + [((), {"ingredient": q, "prescription_required": True, "max_price": 200}) for q in ingredients]
+            + [((), {"manufacturer": m, "min_price": 10, "max_price": 100}) for m in manufacturers]
+        ),
+        "analyze_composition": [((c,), {}) for c in compositions],
+        "count_medicines_by_composition": (
+            [((c,), {"exact_match": True}) for c in compositions]
+            + [((q,), {"mode": "summary"}) for q in ingredients]
+        ),
+        "categorize_medicines": [((), {}), ((50,), {})],
+        "get_all_manufacturers": [((), {})],
+        "suggest_alternatives": [((n,), {}) for n in names] + [((n,), {"max_suggestions": 50}) for n in names[:5]],
+        "get_medicines_by_names": [((batch,), {}) for batch in batches],
+        "autocomplete": (
+            [((name[:length],), {}) for name in names for length in (1, 2, 4)]
+            + [((q,), {"rank_by": "price"}) for q in prefixes]
+        ),
+        "suggest_alternatives_batch": [((batch,), {}) for batch in batches],
+        "reload_medicines": [((), {"wait": True, "force": True})],
+        "get_cache_stats": [((), {})],
+        "get_memory_usage": [((), {})],
+        "configure_profiling": [((), {})],
+        "get_profile_report": [((), {})],
+    }
+
+
+def compare(results, baseline, tolerance: float, floor_ms: float):
+    """
+    Print per-benchmark ratios against a previous run; return the regressions.
+
+    Tools are compared on p50, which is steadier than the mean, and a slow-down
+    smaller than `floor_ms` is ignored so sub-millisecond timer noise on the
+    cheapest tools is not reported.
+    """
+    regressions = []
+    rows = [(f"startup.{key}", value, baseline.get("startup", {}).get(key), 0)
+            for key, value in results["startup"].items()]
+    rows += [(f"tool.{name}", stats["p50_ms"], baseline.get("tools", {}).get(name, {}).get("p50_ms"), floor_ms)
+             for name, stats in results["tools"].items()]
+    for label, value, previous, floor in rows:
+        if not previous:
+            print(f"{label:<48} {value:>12.4f}   (no baseline)")
+            continue
+        ratio = value / previous
+        flag = "  REGRESSION" if ratio > tolerance and value - previous > floor else ""
+        print(f"{label:<48} {value:>12.4f}   {ratio:5.2f}x{flag}")
+        if flag:
+            regressions.append(label)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", required=True, help="Catalogue JSON (see generate_catalogue.py)")
+    parser.add_argument("--output", default="benchmark-results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.2, help="Slow-down ratio reported as a regression")
+    parser.add_argument("--floor-ms", type=float, default=0.05, help="Tool slow-downs smaller than this are not regressions")
+    parser.add_argument("--samples", type=int, default=100, help="Catalogue entries sampled for tool arguments")
+    parser.add_argument("--repeat", type=int, default=3, help="Times each tool call is repeated")
+    parser.add_argument("--startup-repeat", type=int, default=3, help="Times each startup measurement is repeated")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="medicines-bench-")
+    snapshot_path = os.path.join(workdir, "medicines.snapshot")
+    env = dict(os.environ, MEDICINES_DATA_PATH=os.path.abspath(args.data), MEDICINES_SNAPSHOT_PATH=snapshot_path,
+               MEDICINES_CACHE_MAX_ENTRIES="0", MEDICINES_WORKER_MODE="thread")
+
+    # Whole-process startup: without a snapshot (parse + index build) and with one (mmap only)
+    cold = []
+    for _ in range(args.startup_repeat):
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+        cold.append(timed_import(env, 1))
+    startup = {"cold_import_seconds": min(cold), "warm_import_seconds": timed_import(env, args.startup_repeat)}
+
+    os.environ.update(env)
+    sys.path.insert(0, SERVER_DIR)
+    import engine  # noqa: E402
+    import server  # noqa: E402  (maps the snapshot written above)
+
+    with open(args.data, "r", encoding="utf-8") as f:
+        start = time.perf_counter()
+        medicines = json.load(f)
+        startup["json_parse_seconds"] = round(time.perf_counter() - start, 4)
+    start = time.perf_counter()
+    buffer, _ = engine.build_snapshot(medicines, engine.source_stamp(args.data))
+    startup["index_build_seconds"] = round(time.perf_counter() - start, 4)
+    startup["snapshot_bytes"] = len(buffer)
+    del buffer
+    start = time.perf_counter()
+    engine.Catalogue(engine.open_snapshot(snapshot_path))
+    startup["snapshot_open_seconds"] = round(time.perf_counter() - start, 4)
+
+    cases = tool_cases(medicines, random.Random(args.seed), min(args.samples, len(medicines)))
+    registered = [t.name for t in asyncio.run(server.mcp.list_tools())]
+    missing = [name for name in registered if name not in cases]
+    if missing:
+        parser.error(f"no benchmark cases for tools: {', '.join(missing)}")
+
+    tools = {}
+    for name in registered:
+        fn = getattr(server, name)
+        # Reloads rebuild the whole snapshot, so they are not repeated
+        repeat = 1 if name == "reload_medicines" else args.repeat
+        latencies = []
+        for call_args, call_kwargs in cases[name]:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fn(*call_args, **call_kwargs)
+                latencies.append((time.perf_counter() - start) * 1000)
+        tools[name] = summarize(latencies)
+        print(f"{name:<36} mean {tools[name]['mean_ms']:9.3f} ms   p50 {tools[name]['p50_ms']:9.3f} ms   "
+              f"p95 {tools[name]['p95_ms']:9.3f} ms")
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=SERVER_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "data": os.path.abspath(args.data),
+            "records": len(medicines),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "startup": startup,
+        "tools": tools,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Startup: {json.dumps(startup)}")
+    print(f"Wrote {args.output}")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.floor_ms)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than {args.tolerance}x the baseline")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Test fixtures. A small synthetic catalogue (see benchmarks/generate_catalogue.py)
+is written before any test module imports the engine or the server, and both
+are pointed at it, so the tests never read the real medicines.json.
+
+Run from this directory:
+    python -m pytest -q
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SERVER_DIR, "benchmarks"))
+from generate_catalogue import generate  # noqa: E402
+
+# Records in the shared catalogue; small enough to build in well under a second
+FIXTURE_RECORDS = 2000
+FIXTURE_SEED = 42
+
+FIXTURE_DIR = tempfile.mkdtemp(prefix="medicines-tests-")
+os.environ["MEDICINES_DATA_PATH"] = os.path.join(FIXTURE_DIR, "medicines.json")
+os.environ["MEDICINES_SNAPSHOT_PATH"] = os.path.join(FIXTURE_DIR, "medicines.snapshot")
+os.environ["MEDICINES_WATCH_INTERVAL_SECONDS"] = "0"
+
+
+def write_medicines(path: str, medicines) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(medicines, f, ensure_ascii=False)
+    return path
+
+
+write_medicines(os.environ["MEDICINES_DATA_PATH"], list(generate(FIXTURE_RECORDS, FIXTURE_SEED)))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(FIXTURE_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def medicines():
+    """A fresh copy of the shared catalogue's records, free to edit."""
+    return list(generate(FIXTURE_RECORDS, FIXTURE_SEED))
+
+
+@pytest.fixture
+def build_catalogue(tmp_path):
+    """Build a Catalogue from a list of medicine dicts, in its own directory."""
+    import engine
+
+    def build(medicines, previous=None):
+        data_path = write_medicines(str(tmp_path / "medicines.json"), medicines)
+        return engine.build_catalogue(data_path, str(tmp_path / "medicines.snapshot"),
+                                      engine.source_stamp(data_path), previous)[0]
+    return build
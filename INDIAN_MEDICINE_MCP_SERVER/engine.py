@@ -0,0 +1,2051 @@
+"""
+The medicines catalogue shared by the MCP server (server.py) and the REST API
+(flask_server.py): loading medicines.json, the memory-mapped snapshot with
+every lookup index, and the search helpers both front-ends answer from.
+"""
+import base64
+import hashlib
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import threading
+import sys
+from operator import and_, or_
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, List, Dict, Optional, Union
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from collections import Counter, OrderedDict, defaultdict
+from functools import reduce
+from itertools import chain
+import numpy as np
+
+logger = logging.getLogger("medicines-db")
+
+# Locate the large JSON file and its prebuilt snapshot (see "Snapshot storage")
+DATA_PATH = os.environ.get("MEDICINES_DATA_PATH", "/Users/siddharthbajpai/Downloads/MCP_SERVER/medicines.json")
+SNAPSHOT_PATH = os.environ.get("MEDICINES_SNAPSHOT_PATH", os.path.splitext(DATA_PATH)[0] + ".snapshot")
+
+# Active ingredient name in a composition component, e.g. "Paracetamol (650mg)"
+INGREDIENT_PATTERN = re.compile(r"([\w\s-]+)\s*\(")
+
+# Dosage of a composition component, its numeric value and value plus unit
+DOSAGE_PATTERN = re.compile(r"\(([\w\s\d\.\/]+)\)")
+DOSAGE_VALUE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)")
+DOSAGE_UNIT_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*([a-zA-Z]+)")
+
+# Word runs used to tokenize search documents and queries
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Query characters the bit-parallel LCS bound of fuzzy lookups runs on (one
+# 64-bit word); each further character adds one to the bound
+FUZZY_BOUND_CHARACTERS = 63
+
+# Alternatives ranked per medicine when the snapshot is built; tools asking
+# for more results than this rank live
+ALTERNATIVES_TOP_K = 10
+
+# Autocomplete: the best entries of every prefix matching more than
+# AUTOCOMPLETE_SCAN_LIMIT keys are stored in the snapshot (shorter ranges are
+# ranked per keystroke), and at most AUTOCOMPLETE_TOP_K results are returned
+AUTOCOMPLETE_TOP_K = 20
+AUTOCOMPLETE_SCAN_LIMIT = 256
+AUTOCOMPLETE_KINDS = ("medicine", "ingredient", "manufacturer")
+
+# Leading bytes of every suffix the composition suffix array is sorted on;
+# longer substrings are verified against the compositions
+SUFFIX_KEY_BYTES = 16
+
+# Partial products (pairs of non-zeros) computed at once by a sparse matrix
+# product, or cells by a padded per-row ranking; larger jobs run in blocks
+PRODUCT_BUDGET = 4_000_000
+
+# Width of the price bands kept as bitmaps (rupees). Only non-empty bands get
+# a bitmap, and at most PRICE_BUCKET_LIMIT of them: the bands above the last
+# one share a single overflow bitmap
+PRICE_BUCKET_WIDTH = 100
+PRICE_BUCKET_LIMIT = 256
+
+# Helper function for similarity matching
+def similarity_score(a: str, b: str) -> float:
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
+# Helper function to extract active ingredients from composition
+def extract_ingredients(composition: str) -> List[str]:
+    ingredients = []
+    if not composition:
+        return ingredients
+    
+    components = composition.split("+")
+    for component in components:
+        match = INGREDIENT_PATTERN.search(component)
+        if match:
+            ingredients.append(match.group(1).strip())
+        else:
+            # If pattern doesn't match, use the whole component
+            ingredients.append(component.strip())
+    return ingredients
+
+# Helper function to parse each component of a composition string
+def parse_composition(composition: str) -> List[Dict[str, str]]:
+    """
+    Split a composition on '+' into components with their ingredient name
+    and, when present, dosage, dosage value and dosage unit.
+    """
+    ingredients = []
+    for component in composition.split("+"):
+        component = component.strip()
+        
+        # Try to extract ingredient name and dosage
+        name_match = INGREDIENT_PATTERN.search(component)
+        dosage_match = DOSAGE_PATTERN.search(component)
+        
+        ingredient = {
+            "raw_text": component,
+        }
+        
+        if name_match:
+            ingredient["name"] = name_match.group(1).strip()
+        else:
+            ingredient["name"] = component
+            
+        if dosage_match:
+            ingredient["dosage"] = dosage_match.group(1).strip()
+            
+            # Try to further parse the dosage
+            dosage = ingredient["dosage"]
+            value_match = DOSAGE_VALUE_PATTERN.search(dosage)
+            unit_match = DOSAGE_UNIT_PATTERN.search(dosage)
+            
+            if value_match:
+                ingredient["dosage_value"] = value_match.group(1)
+                
+            if unit_match:
+                ingredient["dosage_unit"] = unit_match.group(2)
+        
+        ingredients.append(ingredient)
+    return ingredients
+
+# Helper function to build the canonical key of a composition
+def canonical_composition(composition: str) -> str:
+    """
+    Order-, case- and spacing-insensitive key of a composition: the sorted
+    "ingredient|value|unit" triples of its components, joined by "+". Values
+    are compared as numbers ("500.0" == "500"); the unit keeps everything
+    after the value ("mg/5ml"), so strengths per volume stay distinct. A
+    dosage the parser does not recognize (e.g. "(0.5% w/v)") is kept as text.
+    """
+    parts = []
+    for ingredient in parse_composition(composition):
+        name = " ".join(ingredient["name"].lower().split())
+        if "dosage" in ingredient:
+            dosage = "".join(ingredient["dosage"].lower().split())
+        else:
+            dosage = "".join(ingredient["raw_text"].lower().split())[len(name.replace(" ", "")):]
+        value = ingredient.get("dosage_value", "")
+        unit = dosage
+        if value:
+            unit = dosage[dosage.index(value) + len(value):]
+            value = format(float(value), "g")
+        parts.append(f"{name}|{value}|{unit}")
+    return "+".join(sorted(parts))
+
+# Helper function to normalize text for prefix lookups (case and spacing ignored)
+def autocomplete_key(text: str) -> str:
+    return " ".join(text.lower().split())
+
+# Helper function to format medicine record for display
+def format_medicine(medicine: Dict[str, Any]) -> Dict[str, Any]:
+    """Format a medicine record for better display, adding derived fields."""
+    result = medicine.copy()
+    
+    # Add formatted price if available
+    if "MRP" in result:
+        try:
+            price = float(result["MRP"])
+            result["Price_INR"] = f"₹{price:.2f}"
+            
+            # Add price category
+            if price < 50:
+                result["Price_Category"] = "Low"
+            elif price < 200:
+                result["Price_Category"] = "Medium"
+            elif price < 500:
+                result["Price_Category"] = "High"
+            else:
+                result["Price_Category"] = "Premium"
+                
+        except (ValueError, TypeError):
+            pass
+            
+    # Extract and add active ingredients list
+    if "Composition" in result:
+        result["Active_Ingredients"] = extract_ingredients(result["Composition"])
+        
+        # Number of ingredients
+        result["Ingredient_Count"] = len(result["Active_Ingredients"])
+        
+        # Check if combination medicine (more than one ingredient)
+        result["Is_Combination"] = result["Ingredient_Count"] > 1
+        
+    # Add prescription requirement in plain language
+    if "Prescription" in result:
+        if result["Prescription"] == "Yes":
+            result["Requires_Prescription"] = True
+            result["Prescription_Type"] = "Prescription Required"
+        else:
+            result["Requires_Prescription"] = False
+            result["Prescription_Type"] = "Over-the-Counter"
+            
+    return result
+
+class JSONFragment(str):
+    """Text that is already JSON-encoded and is spliced into responses as is."""
+
+# Helper function to encode a response that embeds pre-encoded fragments
+def encode_response(value: Any) -> str:
+    """
+    Encode `value` exactly as json.dumps(value, ensure_ascii=False) would,
+    except that JSONFragment values are copied in verbatim.
+    """
+    if isinstance(value, JSONFragment):
+        return value
+    if isinstance(value, dict):
+        return "{" + ", ".join(
+            f"{json.dumps(key, ensure_ascii=False)}: {encode_response(item)}" for key, item in value.items()
+        ) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(encode_response(item) for item in value) + "]"
+    return json.dumps(value, ensure_ascii=False)
+
+# ---------------------------------------------------------------------------
+# Snapshot storage
+#
+# A snapshot is one file: an 8-byte magic, the header length, a JSON header
+# (format version, byte order, stamp of the source JSON, section directory)
+# and the sections. Every section is a flat typed array or a UTF-8 string blob
+# aligned to 8 bytes, so the file is memory-mapped and read in place: opening
+# it costs a header parse, not a JSON load and an index build.
+# ---------------------------------------------------------------------------
+SNAPSHOT_MAGIC = b"MEDSNAP\x00"
+SNAPSHOT_FORMAT_VERSION = 13
+
+# Record fields stored as interned columns; any other field is kept per record
+# as a small JSON object
+COLUMN_FIELDS = ("Name", "Manufacturer", "Composition", "MRP", "Prescription")
+
+
+class StringTable:
+    """
+    Read-only sequence of strings stored back to back in a buffer, each one
+    followed by a newline. `offsets[i]` is where string i starts in the blob and
+    the last offset is the blob length.
+    """
+
+    def __init__(self, buffer, start: int, offsets):
+        self.buffer = buffer
+        self.view = memoryview(buffer)
+        self.start = start
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        begin = self.start + self.offsets[index]
+        end = self.start + self.offsets[index + 1] - 1
+        return str(self.view[begin:end], "utf-8")
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def find_indices(self, needle: bytes, limit: Optional[int] = None) -> List[int]:
+        """Indices of the strings whose bytes (newline included) contain `needle`, in order."""
+        indices = []
+        end = self.start + self.offsets[-1]
+        position = self.buffer.find(needle, self.start, end)
+        while position != -1:
+            index = bisect_right(self.offsets, position - self.start) - 1
+            indices.append(index)
+            if limit is not None and len(indices) >= limit:
+                break
+            # Continue after the matched string so each string is reported once
+            position = self.buffer.find(needle, self.start + self.offsets[index + 1], end)
+        return indices
+
+    def containing(self, substring: str, limit: Optional[int] = None) -> List[int]:
+        """Indices of the strings containing `substring`, in order."""
+        if not substring or "\n" in substring:
+            # A newline could span the separator, so test each string instead
+            indices = []
+            for index, text in enumerate(self):
+                if substring in text:
+                    indices.append(index)
+                    if limit is not None and len(indices) >= limit:
+                        break
+            return indices
+        return self.find_indices(substring.encode("utf-8"), limit)
+
+
+class SubstringIndex:
+    """
+    Suffix array over a StringTable's blob: the start of every suffix at which
+    a substring can begin, sorted. The suffixes beginning with a given
+    substring form one contiguous range, found with two binary searches, so a
+    containment query costs a logarithmic search plus its matches instead of
+    a scan over every string.
+    """
+
+    def __init__(self, strings: StringTable, suffixes):
+        self.strings = strings
+        self.suffixes = suffixes
+        self.suffix_array = np.asarray(suffixes)
+        self.string_starts = np.asarray(strings.offsets)
+
+    @staticmethod
+    def build(blob: bytes) -> array:
+        """
+        Suffix starts of a newline-separated blob (not at newlines or UTF-8
+        continuation bytes), sorted by their first SUFFIX_KEY_BYTES bytes up
+        to their string's newline. Ties keep blob order.
+        """
+        data = np.frombuffer(blob, dtype=np.uint8)
+        starts = np.flatnonzero((data != 0x0A) & ((data & 0xC0) != 0x80))
+        newlines = np.flatnonzero(data == 0x0A)
+        ends = newlines[np.searchsorted(newlines, starts)]
+        padded = np.concatenate([data, np.zeros(SUFFIX_KEY_BYTES, dtype=np.uint8)])
+        # The key bytes as big-endian words, zeroed past the newline
+        words = []
+        for first in range(0, SUFFIX_KEY_BYTES, 8):
+            word = np.zeros(len(starts), dtype=np.uint64)
+            for offset in range(first, first + 8):
+                byte = np.where(starts + offset <= ends, padded[starts + offset], 0)
+                word = (word << np.uint64(8)) | byte.astype(np.uint64)
+            words.append(word)
+        suffixes = array("i")
+        suffixes.frombytes(starts[np.lexsort(words[::-1])].astype(np.int32).tobytes())
+        return suffixes
+
+    def containing(self, substring: str):
+        """Indices (ascending NumPy array) of the strings containing `substring`."""
+        if not substring or "\n" in substring:
+            return np.asarray(self.strings.containing(substring), dtype=np.int64)
+        needle = substring.encode("utf-8")
+        prefix = needle[:SUFFIX_KEY_BYTES]
+        buffer, start = self.strings.buffer, self.strings.start
+
+        # A suffix compares with the prefix as its key would: both differ at
+        # its newline at the latest, as the prefix has none
+        def key(position):
+            return buffer[start + position:start + position + len(prefix)]
+
+        positions = self.suffix_array[
+            bisect_left(self.suffixes, prefix, key=key):bisect_right(self.suffixes, prefix, key=key)
+        ]
+        if len(needle) > len(prefix):
+            positions = np.array([
+                position for position in positions.tolist()
+                if buffer[start + position:start + position + len(needle)] == needle
+            ], dtype=np.int64)
+        return np.unique(np.searchsorted(self.string_starts, positions, side="right") - 1)
+
+
+class SortedView:
+    """Sequence view of a StringTable in the order given by a permutation."""
+
+    def __init__(self, strings: StringTable, order):
+        self.strings = strings
+        self.order = order
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __getitem__(self, index: int) -> str:
+        return self.strings[self.order[index]]
+
+
+class RaggedArray:
+    """Read-only sequence of integer lists stored as one values array plus offsets."""
+
+    def __init__(self, offsets, values):
+        self.offsets = offsets
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int):
+        return self.values[self.offsets[index]:self.offsets[index + 1]]
+
+    def size(self, index: int) -> int:
+        return self.offsets[index + 1] - self.offsets[index]
+
+
+class PostingIndex:
+    """
+    Read-only mapping of string keys to lists of ids. Keys keep their insertion
+    order (the order a dict built from the catalogue would iterate in); lookups
+    binary-search the keys through `sorted_order`, or directly when the keys
+    were inserted sorted.
+    """
+
+    def __init__(self, keys: StringTable, postings: RaggedArray, sorted_order=None):
+        self.keys = keys
+        self.postings = postings
+        self.sorted_keys = keys if sorted_order is None else SortedView(keys, sorted_order)
+        self.sorted_order = sorted_order
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __contains__(self, key) -> bool:
+        return self.position(key) is not None
+
+    def position(self, key: str) -> Optional[int]:
+        """Insertion-order position of `key`, or None."""
+        index = bisect_left(self.sorted_keys, key)
+        if index < len(self.sorted_keys) and self.sorted_keys[index] == key:
+            return index if self.sorted_order is None else self.sorted_order[index]
+        return None
+
+    def get(self, key: str, default=()):
+        position = self.position(key)
+        return default if position is None else self.postings[position]
+
+    def __getitem__(self, key: str):
+        position = self.position(key)
+        if position is None:
+            raise KeyError(key)
+        return self.postings[position]
+
+    def items(self):
+        for position, key in enumerate(self.keys):
+            yield key, self.postings[position]
+
+
+class IncidenceMatrix:
+    """
+    Sparse 0/1 matrix in CSR form on NumPy arrays: row i has ones in the
+    columns indices[indptr[i]:indptr[i + 1]] (distinct, ascending). Products
+    only touch the non-zeros, and arrays mapped from a snapshot are used in
+    place.
+    """
+
+    def __init__(self, indptr, indices, columns: int):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices)
+        self.columns = columns
+        self.row_sizes = np.diff(self.indptr)
+
+    @classmethod
+    def from_rows(cls, rows: List, columns: int) -> "IncidenceMatrix":
+        """Build from the sorted, distinct column ids of each row."""
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=indptr[1:])
+        indices = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=int(indptr[-1]))
+        return cls(indptr, indices, columns)
+
+    def __len__(self) -> int:
+        return len(self.row_sizes)
+
+    def transpose(self) -> "IncidenceMatrix":
+        """The same matrix in CSC form, i.e. the CSR form of its transpose."""
+        rows = np.repeat(np.arange(len(self)), self.row_sizes)
+        indptr = np.zeros(self.columns + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=self.columns), out=indptr[1:])
+        return IncidenceMatrix(indptr, rows[np.argsort(self.indices, kind="stable")], len(self))
+
+    def gather(self, rows, limits=None) -> tuple:
+        """
+        Column ids of the given rows (at most `limits` of each, if given),
+        concatenated, and the position in `rows` each came from.
+        """
+        sizes = self.row_sizes[rows] if limits is None else np.minimum(self.row_sizes[rows], limits)
+        owners = np.repeat(np.arange(len(sizes)), sizes)
+        starts = self.indptr[rows] - (np.cumsum(sizes) - sizes)
+        return self.indices[starts[owners] + np.arange(len(owners))], owners
+
+    def row_sum(self, rows) -> tuple:
+        """
+        Sum of the given rows (the product of their indicator vector with the
+        matrix), as the ascending ids of the non-zero columns and their values.
+        """
+        columns, _ = self.gather(rows)
+        if len(columns) * 16 >= self.columns:
+            # Dense counting beats sorting once the rows cover much of the matrix
+            counts = np.bincount(columns, minlength=self.columns)
+            nonzero = np.flatnonzero(counts)
+            return nonzero, counts[nonzero]
+        return np.unique(columns, return_counts=True)
+
+    def products(self, other: "IncidenceMatrix", budget: int = PRODUCT_BUDGET):
+        """
+        The sparse product `self @ other`, in blocks of rows of at most about
+        `budget` partial products each.
+
+        Yields:
+            (first row, end row, rows, columns, values) of each block, its
+            non-zeros sorted by row, then column.
+        """
+        # Partial products before each row: every non-zero (i, k) of self
+        # pairs with the non-zeros of row k of other
+        work = np.zeros(len(self.indices) + 1, dtype=np.int64)
+        np.cumsum(other.row_sizes[self.indices], out=work[1:])
+        row_work = work[self.indptr]
+
+        start = 0
+        while start < len(self):
+            end = int(np.searchsorted(row_work, row_work[start] + budget, side="right")) - 1
+            end = min(max(end, start + 1), len(self))
+            middle, owners = self.gather(np.arange(start, end))
+            columns, partial_owners = other.gather(middle)
+            keys, values = np.unique(owners[partial_owners] * other.columns + columns, return_counts=True)
+            yield start, end, keys // other.columns + start, keys % other.columns, values
+            start = end
+
+
+def top_k(scores, k: int, ties=None):
+    """
+    Positions of the `k` highest `scores`, best first. Equal scores are
+    ordered by `ties` (ascending), then by position, as a stable sort would
+    order them; only the scores from the k-th highest up (found with
+    argpartition) are sorted.
+    """
+    count = len(scores)
+    if k <= 0 or not count:
+        return np.empty(0, dtype=np.int64)
+    if k < count:
+        cutoff = scores[np.argpartition(scores, count - k)[count - k]]
+        candidates = np.flatnonzero(scores >= cutoff)
+    else:
+        candidates = np.arange(count)
+    keys = (-scores[candidates],) if ties is None else (ties[candidates], -scores[candidates])
+    return candidates[np.lexsort(keys)][:k]
+
+
+def shortlist(values, k: int, margin: float):
+    """
+    Ascending positions of the `values` within `margin` of the k-th highest:
+    every value that can still be among the top k once values are rounded to
+    less than `margin`.
+    """
+    count = len(values)
+    if k >= count:
+        return np.arange(count)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    cutoff = values[np.argpartition(values, count - k)[count - k]]
+    return np.flatnonzero(values >= cutoff - margin)
+
+
+def segment_ranks(owners):
+    """Position of every element within its run of equal `owners` (sorted)."""
+    positions = np.arange(len(owners))
+    starts = np.ones(len(owners), dtype=bool)
+    starts[1:] = owners[1:] != owners[:-1]
+    return positions - np.maximum.accumulate(np.where(starts, positions, 0))
+
+
+def segment_cumsum(values, owners):
+    """Running totals of `values` restarting at every run of equal `owners` (sorted)."""
+    totals = np.cumsum(values)
+    return totals - (totals - values)[np.arange(len(owners)) - segment_ranks(owners)]
+
+
+def row_blocks(widths, budget: int = PRODUCT_BUDGET):
+    """
+    Split rows into consecutive (start, end) blocks of at most `budget` cells,
+    every row of a block being padded to the block's widest row.
+    """
+    start = 0
+    widths = widths.tolist()
+    while start < len(widths):
+        end = start + 1
+        widest = max(widths[start], 1)
+        while end < len(widths) and max(widest, widths[end]) * (end - start + 1) <= budget:
+            widest = max(widest, widths[end])
+            end += 1
+        yield start, end
+        start = end
+
+
+class Snapshot:
+    """A parsed snapshot header plus typed views over the mapped sections."""
+
+    def __init__(self, buffer, path: Optional[str] = None):
+        view = memoryview(buffer)
+        if bytes(view[:len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+            raise ValueError("not a medicines snapshot")
+        header_length = int.from_bytes(view[8:16], "little")
+        header = json.loads(str(view[16:16 + header_length], "utf-8"))
+        if header.get("format_version") != SNAPSHOT_FORMAT_VERSION or header.get("byteorder") != sys.byteorder:
+            raise ValueError("incompatible snapshot format")
+
+        self.buffer = buffer
+        self.path = path
+        self.view = view
+        self.header = header
+        self.source = header.get("source")
+        self.sections = header["sections"]
+        self.data_start = align(16 + header_length)
+
+    def array(self, name: str):
+        typecode, offset, length = self.sections[name]
+        start = self.data_start + offset
+        return self.view[start:start + length].cast(typecode)
+
+    def strings(self, name: str) -> StringTable:
+        return StringTable(self.buffer, self.data_start + self.sections[name + ".blob"][1], self.array(name + ".offsets"))
+
+    def ragged(self, name: str) -> RaggedArray:
+        return RaggedArray(self.array(name + ".offsets"), self.array(name + ".values"))
+
+    def postings(self, name: str) -> PostingIndex:
+        sorted_order = self.array(name + ".sorted_order") if name + ".sorted_order" in self.sections else None
+        return PostingIndex(self.strings(name + ".keys"), self.ragged(name), sorted_order)
+
+
+def align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class SnapshotWriter:
+    """Collects typed arrays and string tables and lays them out as a snapshot."""
+
+    def __init__(self):
+        self.sections = {}
+
+    def add_array(self, name: str, typecode: str, values):
+        if isinstance(values, np.ndarray):
+            data = array(typecode)
+            data.frombytes(values.astype(data.typecode).tobytes())
+        else:
+            data = values if isinstance(values, array) else array(typecode, values)
+        self.sections[name] = (typecode, data.tobytes())
+
+    def add_strings(self, name: str, strings):
+        offsets = array("q", [0])
+        parts = []
+        total = 0
+        for text in strings:
+            encoded = text.encode("utf-8") + b"\n"
+            parts.append(encoded)
+            total += len(encoded)
+            offsets.append(total)
+        self.add_array(name + ".offsets", "q", offsets)
+        self.sections[name + ".blob"] = ("B", b"".join(parts))
+
+    def add_ragged(self, name: str, lists):
+        offsets = array("q", [0])
+        values = array("i")
+        for items in lists:
+            values.extend(items)
+            offsets.append(len(values))
+        self.add_array(name + ".offsets", "q", offsets)
+        self.add_array(name + ".values", "i", values)
+
+    def add_postings(self, name: str, index: Dict[str, List[int]], keep_order: bool = False):
+        """Store a key -> ids dict; `keep_order` preserves its insertion order for iteration."""
+        keys = list(index)
+        if keep_order:
+            self.add_array(name + ".sorted_order", "i", sorted(range(len(keys)), key=keys.__getitem__))
+        else:
+            keys.sort()
+        self.add_strings(name + ".keys", keys)
+        self.add_ragged(name, (index[key] for key in keys))
+
+    def to_bytes(self, source: Optional[List[int]]) -> bytearray:
+        directory = {}
+        position = 0
+        for name, (typecode, data) in self.sections.items():
+            directory[name] = [typecode, position, len(data)]
+            position = align(position + len(data))
+        header = json.dumps({
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "byteorder": sys.byteorder,
+            "source": source,
+            "sections": directory
+        }).encode("utf-8")
+
+        data_start = align(16 + len(header))
+        buffer = bytearray(data_start + position)
+        buffer[:8] = SNAPSHOT_MAGIC
+        buffer[8:16] = len(header).to_bytes(8, "little")
+        buffer[16:16 + len(header)] = header
+        for name, (typecode, data) in self.sections.items():
+            start = data_start + directory[name][1]
+            buffer[start:start + len(data)] = data
+        return buffer
+
+
+@dataclass(frozen=True)
+class RecordFacts:
+    """What the snapshot derives from a single record, independent of the others."""
+    digest: int          # Hash of the record's JSON text, to recognize unchanged records
+    document: str        # Lowercased JSON text the full-text search matches against
+    formatted: str       # JSON-encoded format_medicine() output
+    tokens: frozenset    # Distinct word tokens of the document
+
+
+def record_digest(text: str) -> int:
+    """64-bit digest of a record's JSON text (signed, to fit a 'q' array)."""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def derive_record_facts(entry: dict, digest: int, text: str) -> RecordFacts:
+    document = text.lower()
+    return RecordFacts(
+        digest,
+        document,
+        json.dumps(format_medicine(entry), ensure_ascii=False),
+        frozenset(TOKEN_PATTERN.findall(document))
+    )
+
+
+def build_aggregates(record_count: int, manufacturer_index: Dict[str, List[int]],
+                     prescription_index: Dict[str, List[int]], record_prices: array,
+                     record_ingredients: List[List[str]]) -> List[str]:
+    """
+    Catalogue-wide aggregates, computed once per dataset generation. They are
+    recomputed over every record on each build, not patched from the changed
+    records: one pass over prices, manufacturers and ingredients, small next to
+    the index assembly build_snapshot already does over every record.
+
+    Returns:
+        [get_medicine_statistics JSON, get_all_manufacturers JSON, categories
+        JSON (a [ingredient, medicine count, first three record ids] list per
+        primary ingredient, largest first)]
+    """
+    stats = {
+        "total_medicines": record_count,
+        "prescription_count": len(prescription_index.get("Yes", ())),
+        "otc_count": len(prescription_index.get("No", ())),
+        "unknown_prescription_status": record_count - len(prescription_index.get("Yes", ())) - len(prescription_index.get("No", ())),
+        "manufacturer_counts": dict(Counter({mfr: len(record_ids) for mfr, record_ids in manufacturer_index.items()}).most_common(10)),
+        "price_distribution": {
+            "min_price": None,
+            "max_price": None,
+            "avg_price": None,
+            "price_ranges": {}
+        }
+    }
+
+    # Price statistics (records without a valid MRP have a NaN price)
+    prices = [price for price in record_prices if not math.isnan(price)]
+    price_ranges = defaultdict(int)
+    for price in prices:
+        # Price distribution in ranges of 100 (an infinite MRP has no range)
+        if not math.isfinite(price):
+            continue
+        range_key = f"₹{math.floor(price/100)*100} - ₹{math.floor(price/100)*100 + 99.99}"
+        price_ranges[range_key] += 1
+
+    if prices:
+        stats["price_distribution"]["min_price"] = f"₹{min(prices):.2f}"
+        stats["price_distribution"]["max_price"] = f"₹{max(prices):.2f}"
+        stats["price_distribution"]["avg_price"] = f"₹{sum(prices)/len(prices):.2f}"
+        stats["price_distribution"]["price_ranges"] = dict(sorted(price_ranges.items()))
+
+    # Common active ingredients
+    stats["common_ingredients"] = dict(Counter(chain.from_iterable(record_ingredients)).most_common(10))
+
+    # Manufacturers by medicine count (descending)
+    manufacturers = [
+        {"name": manufacturer, "medicine_count": len(record_ids)}
+        for manufacturer, record_ids in manufacturer_index.items()
+    ]
+    manufacturers.sort(key=lambda x: x["medicine_count"], reverse=True)
+
+    # Categories keyed by each record's first (primary) ingredient
+    categories = defaultdict(list)
+    for record_id, ingredients in enumerate(record_ingredients):
+        if ingredients:
+            categories[ingredients[0]].append(record_id)
+    ranked = sorted(categories.items(), key=lambda x: len(x[1]), reverse=True)
+
+    return [
+        json.dumps(stats, ensure_ascii=False),
+        json.dumps(manufacturers, ensure_ascii=False),
+        json.dumps([[category, len(record_ids), record_ids[:3]] for category, record_ids in ranked], ensure_ascii=False)
+    ]
+
+
+def price_keys(groups, prices):
+    """(group, price) pairs as complex numbers, which NumPy orders (and searches) lexicographically."""
+    keys = np.empty(len(prices), dtype=np.complex128)
+    keys.real = groups
+    keys.imag = prices
+    return keys
+
+
+def closest_in_price(group_keys, group_ids, group_names, groups, prices, name_ids, counts, windows) -> tuple:
+    """
+    For each query, the `count` records of its group closest to its price
+    (ties in catalogue order), skipping records named like the query's
+    reference medicine.
+
+    Args:
+        group_keys, group_ids, group_names: The priced records of every group,
+            sorted by (group, price, record id): price_keys(group, price),
+            record ids and name ids.
+        groups, prices, name_ids, counts: Per query: its group, price, name id
+            and the number of records wanted.
+        windows: Per query, how many records around its price are compared;
+            must cover `count` plus every skipped record.
+
+    Returns:
+        (queries, record ids): the chosen records, by query, closest first.
+    """
+    size = len(group_keys)
+    if not size:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    group_prices = group_keys.imag
+    group_starts = np.searchsorted(group_keys, price_keys(groups, np.full(len(groups), -np.inf)), side="left")
+    group_ends = np.searchsorted(group_keys, price_keys(groups, np.full(len(groups), np.inf)), side="right")
+    positions = np.searchsorted(group_keys, price_keys(groups, prices), side="left")
+
+    # Distance to the window-th closest record of the group, which lies among
+    # the `window` records on either side of the price
+    distances = np.zeros(len(prices))
+    for start, end in row_blocks(2 * windows):
+        width = int(windows[start:end].max())
+        around = positions[start:end, None] + np.arange(-width, width)
+        inside = (around >= group_starts[start:end, None]) & (around < group_ends[start:end, None])
+        gaps = np.where(inside, np.abs(group_prices[np.clip(around, 0, size - 1)] - prices[start:end, None]), np.inf)
+        gaps.sort(axis=1)
+        rank = np.minimum(windows[start:end], inside.sum(axis=1)) - 1
+        distances[start:end] = np.where(rank >= 0, gaps[np.arange(end - start), np.maximum(rank, 0)], 0.0)
+
+    # Widen to every record within that distance (ties included), with slack
+    # for rounding, then rank exactly
+    slack = distances * 1e-9 + 1e-9
+    lows = np.searchsorted(group_keys, price_keys(groups, prices - distances - slack), side="left")
+    highs = np.searchsorted(group_keys, price_keys(groups, prices + distances + slack), side="right")
+    queries = []
+    record_ids = []
+    for start, end in row_blocks(highs - lows):
+        span = np.arange(int((highs[start:end] - lows[start:end]).max()))
+        around = np.minimum(lows[start:end, None] + span, size - 1)
+        eligible = (span < (highs[start:end] - lows[start:end])[:, None]) & (group_names[around] != name_ids[start:end, None])
+        gaps = np.where(eligible, np.abs(group_prices[around] - prices[start:end, None]), np.inf)
+        candidate_ids = group_ids[around]
+        order = np.lexsort((candidate_ids, gaps), axis=-1)
+        eligible = np.take_along_axis(eligible, order, axis=1)
+        chosen = eligible & (np.cumsum(eligible, axis=1) <= counts[start:end, None])
+        queries.append(np.nonzero(chosen)[0] + start)
+        record_ids.append(np.take_along_axis(candidate_ids, order, axis=1)[chosen])
+    return np.concatenate(queries), np.concatenate(record_ids)
+
+
+def rank_alternatives(record_ingredients: List[List[int]], record_name_ids: array, record_prices: array) -> tuple:
+    """
+    Rank the top ALTERNATIVES_TOP_K medicines for every medicine, as
+    find_similar_medicines and suggest_alternatives would. Similarity only
+    depends on the ingredient sets, so it is computed once per pair of
+    distinct sets sharing an ingredient, by a sparse product of the set ×
+    ingredient incidence matrix with its transpose; the rankings are then
+    built for blocks of sets at a time with array operations.
+
+    Args:
+        record_ingredients: Ingredient ids of each record.
+        record_name_ids: Name id of each record; same-name records are skipped.
+        record_prices: Parsed price of each record (NaN when invalid).
+
+    Returns:
+        (similar, alternatives): per record, record ids ordered by Jaccard
+        similarity; and record ids with a similarity of at least 0.5 and a
+        valid (finite) price, ordered by similarity, then closeness in price.
+    """
+    record_count = len(record_ingredients)
+    names = np.frombuffer(record_name_ids, dtype=np.intc)
+    prices = np.frombuffer(record_prices, dtype=np.float64)
+    # Records a medicine's rankings skip: those sharing its name (name id -1
+    # for records without one)
+    skips = np.bincount(names + 1)[names + 1]
+
+    # Distinct ingredient sets, the set of every record (-1 without
+    # ingredients) and the records of every set, in catalogue order
+    set_ids = {}
+    record_sets = np.fromiter(
+        (set_ids.setdefault(frozenset(ingredient_ids), len(set_ids)) if ingredient_ids else -1
+         for ingredient_ids in record_ingredients),
+        dtype=np.int64, count=record_count
+    )
+    ingredient_count = max((max(key) for key in set_ids), default=-1) + 1
+    sets = IncidenceMatrix.from_rows([sorted(key) for key in set_ids], ingredient_count)
+    order = np.argsort(record_sets, kind="stable")
+    set_records = IncidenceMatrix(np.searchsorted(record_sets[order], np.arange(len(set_ids) + 1)), order, record_count)
+    # The same for the priced records, in price order, with every record's
+    # rank in (price, record id) order
+    priced = np.flatnonzero(np.isfinite(prices))
+    price_ranks = np.zeros(record_count, dtype=np.int64)
+    price_ranks[priced[np.argsort(prices[priced], kind="stable")]] = np.arange(len(priced))
+    order = priced[np.lexsort((price_ranks[priced], record_sets[priced]))]
+    set_priced = IncidenceMatrix(np.searchsorted(record_sets[order], np.arange(len(set_ids) + 1)), order, record_count)
+
+    similar = ([], [])
+    alternatives = ([], [])
+    for first, last, rows, candidates, intersections in sets.products(sets.transpose()):
+        # Candidate sets of every set, best first; a group is a run of equal
+        # similarity (the same expression as Catalogue.ingredient_similarity,
+        # so scores compare exactly). Group ids increase in ranked order.
+        similarities = intersections / (sets.row_sizes[rows] + sets.row_sizes[candidates] - intersections)
+        ranking = np.lexsort((-similarities, rows))
+        rows, candidates, similarities = rows[ranking], candidates[ranking], similarities[ranking]
+        group_starts = np.ones(len(rows), dtype=bool)
+        group_starts[1:] = (rows[1:] != rows[:-1]) | (similarities[1:] != similarities[:-1])
+        groups = np.cumsum(group_starts) - 1
+        group_rows = rows[group_starts]
+        group_ranks = segment_ranks(group_rows)
+
+        # The block's medicines (by set) and the records every set's ranking
+        # needs so that each of its medicines can skip its own name
+        references, reference_sets = set_records.gather(np.arange(first, last))
+        needed = ALTERNATIVES_TOP_K + np.maximum.reduceat(skips[references], np.searchsorted(reference_sets, np.arange(last - first)))
+
+        # Similar: records of the best groups in ranked order (catalogue order
+        # within a group), up to `needed` per set
+        group_sizes = np.add.reduceat(set_records.row_sizes[candidates], np.flatnonzero(group_starts))
+        wanted = (segment_cumsum(group_sizes, group_rows) - group_sizes < needed[group_rows - first])[groups]
+        ranked, owners = set_records.gather(candidates[wanted], needed[rows[wanted] - first])
+        ranked_groups = groups[wanted][owners]
+        ranking = np.lexsort((ranked, ranked_groups))
+        ranked, ranked_rows = ranked[ranking], group_rows[ranked_groups[ranking]]
+        kept = segment_ranks(ranked_rows) < needed[ranked_rows - first]
+        ranked, ranked_rows = ranked[kept], ranked_rows[kept]
+        ranked_lists = IncidenceMatrix(np.searchsorted(ranked_rows, np.arange(first, last + 1)), ranked, record_count)
+
+        # Each medicine takes the first ALTERNATIVES_TOP_K of its set's list
+        # that do not share its name
+        candidates_of, owners = ranked_lists.gather(reference_sets)
+        eligible = names[candidates_of] != names[references][owners]
+        chosen = eligible & (segment_cumsum(eligible, owners) <= ALTERNATIVES_TOP_K)
+        similar[0].append(references[owners[chosen]])
+        similar[1].append(candidates_of[chosen])
+
+        # Alternatives: priced medicines walk their set's groups of similarity
+        # 0.5 or more, taking the records closest in price from each
+        priced = np.isfinite(prices[references])
+        references, reference_sets = references[priced], reference_sets[priced]
+        missing = np.full(len(references), ALTERNATIVES_TOP_K)
+        group_similarities = similarities[group_starts]
+        for rank in range(int(group_ranks.max(initial=-1)) + 1):
+            set_groups = np.full(last - first, -1)
+            current = np.flatnonzero((group_ranks == rank) & (group_similarities >= 0.5))
+            set_groups[group_rows[current] - first] = current
+            active = np.flatnonzero((missing > 0) & (set_groups[reference_sets] >= 0))
+            if not len(active):
+                break
+            # Priced records of the groups still walked, sorted by (group, price,
+            # record id): a merge of the sets' price-sorted runs
+            walked = np.zeros(len(group_rows), dtype=bool)
+            walked[set_groups[reference_sets[active]]] = True
+            members = walked[groups]
+            group_ids, owners = set_priced.gather(candidates[members])
+            member_groups = groups[members][owners]
+            ranking = np.argsort(member_groups * record_count + price_ranks[group_ids], kind="stable")
+            group_ids, member_groups = group_ids[ranking], member_groups[ranking]
+
+            active_ids = references[active]
+            queries, record_ids = closest_in_price(
+                price_keys(member_groups, prices[group_ids]), group_ids, names[group_ids],
+                set_groups[reference_sets[active]], prices[active_ids], names[active_ids],
+                missing[active], missing[active] + skips[active_ids]
+            )
+            alternatives[0].append(active_ids[queries])
+            alternatives[1].append(record_ids)
+            missing[active] -= np.bincount(queries, minlength=len(active))
+
+    def per_record(owners, record_ids) -> List[List[int]]:
+        # Stable, so every medicine keeps its ranked order
+        owners = np.concatenate(owners or [np.empty(0, dtype=np.int64)])
+        order = np.argsort(owners, kind="stable")
+        values = np.concatenate(record_ids or [np.empty(0, dtype=np.int64)])[order].tolist()
+        offsets = np.searchsorted(owners[order], np.arange(record_count + 1)).tolist()
+        return [values[offsets[i]:offsets[i + 1]] for i in range(record_count)]
+
+    return per_record(*similar), per_record(*alternatives)
+
+
+def build_autocomplete(writer: "SnapshotWriter", vocabularies: List, record_prices: array):
+    """
+    Write the autocomplete index: every medicine name, ingredient and
+    manufacturer as a normalized key, sorted so that the keys starting with a
+    prefix form one contiguous range found by bisection.
+
+    Each entry keeps its kind, its position in that kind's index, how many
+    medicines it covers (popularity) and their lowest price, plus its rank
+    under both orderings. Ranges longer than AUTOCOMPLETE_SCAN_LIMIT (short
+    prefixes such as "p") would be too slow to rank per keystroke, so their
+    top AUTOCOMPLETE_TOP_K entries are stored per prefix.
+
+    Args:
+        writer: Snapshot being built.
+        vocabularies: Per kind, in AUTOCOMPLETE_KINDS order, (text, record ids)
+            pairs in the order of that kind's stored index.
+        record_prices: Parsed price of every record (NaN when missing).
+    """
+    entries = []
+    for kind, vocabulary in enumerate(vocabularies):
+        for position, (text, record_ids) in enumerate(vocabulary):
+            key = autocomplete_key(text)
+            if key:
+                prices = [record_prices[record_id] for record_id in record_ids if not math.isnan(record_prices[record_id])]
+                entries.append((key, kind, position, len(record_ids), min(prices) if prices else math.inf))
+    entries.sort()
+    keys = [entry[0] for entry in entries]
+
+    writer.add_strings("autocomplete_keys", keys)
+    writer.add_array("autocomplete_kinds", "b", (entry[1] for entry in entries))
+    writer.add_array("autocomplete_positions", "i", (entry[2] for entry in entries))
+    writer.add_array("autocomplete_counts", "i", (entry[3] for entry in entries))
+    writer.add_array("autocomplete_prices", "d", (entry[4] for entry in entries))
+
+    # Prefixes whose range is too long to rank per keystroke: split each long
+    # range by the next character, starting from the empty prefix
+    long_ranges = [("", 0, len(keys))] if len(keys) > AUTOCOMPLETE_SCAN_LIMIT else []
+    pending = list(long_ranges)
+    while pending:
+        prefix, low, high = pending.pop()
+        depth = len(prefix)
+        start = low
+        while start < high:
+            if len(keys[start]) == depth:
+                # The prefix itself is a key; it sorts first in its range
+                start += 1
+                continue
+            child = keys[start][:depth + 1]
+            end = bisect_left(keys, child + "\U0010ffff", start, high)
+            if end - start > AUTOCOMPLETE_SCAN_LIMIT:
+                long_ranges.append((child, start, end))
+                pending.append((child, start, end))
+            start = end
+
+    orderings = {
+        "popularity": lambda i: (-entries[i][3], i),
+        "price": lambda i: (entries[i][4], -entries[i][3], i),
+    }
+    for name, sort_key in orderings.items():
+        order = sorted(range(len(entries)), key=sort_key)
+        ranks = array("i", [0]) * len(entries)
+        for rank, entry_id in enumerate(order):
+            ranks[entry_id] = rank
+        writer.add_array(f"autocomplete_{name}_ranks", "i", ranks)
+        writer.add_postings(f"autocomplete_{name}", {
+            prefix: [order[rank] for rank in sorted(ranks[low:high])[:AUTOCOMPLETE_TOP_K]]
+            for prefix, low, high in long_ranges
+        })
+
+
+def build_snapshot(medicines: List[dict], source: Optional[List[int]], previous: Optional["Catalogue"] = None) -> tuple:
+    """
+    Build the records and every index from the parsed JSON into snapshot bytes.
+
+    Records whose JSON is unchanged since the `previous` generation reuse its
+    per-record facts (search document, formatted JSON) instead of deriving them
+    again, so a reload after a small catalogue edit only re-derives the edited
+    records. The indices, rankings and aggregates are still assembled over
+    every record, so a build costs O(records) however few of them changed.
+
+    Returns:
+        (snapshot bytes, number of records whose facts were reused)
+    """
+    writer = SnapshotWriter()
+
+    previous_ids = previous.digest_index() if previous is not None else {}
+    facts = []
+    reused = 0
+    for entry in medicines:
+        text = json.dumps(entry, ensure_ascii=False)
+        digest = record_digest(text)
+        previous_id = previous_ids.get(digest)
+        if previous_id is None:
+            facts.append(derive_record_facts(entry, digest, text))
+        else:
+            facts.append(previous.record_facts(previous_id))
+            reused += 1
+    del previous_ids
+
+    writer.add_array("record_digests", "q", (fact.digest for fact in facts))
+    writer.add_strings("documents", (fact.document for fact in facts))
+    writer.add_strings("formatted_records", (fact.formatted for fact in facts))
+
+    # 3) Create multiple indices for fast lookups (values are record ids, i.e.
+    #    positions in the catalogue)
+    name_index = {}
+    manufacturer_index = defaultdict(list)
+    composition_index = defaultdict(list)
+    composition_groups = defaultdict(list)
+    canonical_index = defaultdict(list)
+    prescription_index = {"Yes": [], "No": []}
+    all_ingredients = set()
+    ingredient_postings = defaultdict(list)
+    record_ingredients = []
+    record_prices = array("d")
+    token_postings = defaultdict(list)
+    # Ingredient keys, extracted ingredients and canonical key per distinct
+    # composition
+    composition_facts = {}
+
+    for record_id, entry in enumerate(medicines):
+        # Name index (all records per name; lookups return the last one)
+        if "Name" in entry:
+            name_index.setdefault(entry["Name"], []).append(record_id)
+
+        # Manufacturer index
+        if "Manufacturer" in entry:
+            manufacturer_index[entry["Manufacturer"]].append(record_id)
+
+        # Composition index (split by '+' to index individual components);
+        # each record is listed once per key
+        ingredients = []
+        if "Composition" in entry:
+            full_comp = entry["Composition"]
+            composition_groups[full_comp].append(record_id)
+            if full_comp not in composition_facts:
+                composition_keys = {full_comp: None}
+                # Index individual components
+                for component in full_comp.split("+"):
+                    # Extract the active ingredient name (removing dosage info)
+                    match = INGREDIENT_PATTERN.search(component.strip())
+                    if match:
+                        ingredient = match.group(1).strip()
+                        composition_keys[ingredient] = None
+                        all_ingredients.add(ingredient)
+                composition_facts[full_comp] = (
+                    tuple(composition_keys), extract_ingredients(full_comp), canonical_composition(full_comp)
+                )
+            composition_keys, ingredients, canonical_key = composition_facts[full_comp]
+            for key in composition_keys:
+                composition_index[key].append(record_id)
+            # Same ingredients at the same strengths, however the text is written
+            canonical_index[canonical_key].append(record_id)
+
+        # Parsed ingredient list and an ingredient -> record-id posting index
+        record_ingredients.append(ingredients)
+        for ingredient in dict.fromkeys(ingredients):
+            ingredient_postings[ingredient].append(record_id)
+
+        # Parsed price (NaN when MRP is missing or invalid)
+        price = math.nan
+        if "MRP" in entry:
+            try:
+                price = float(entry["MRP"])
+            except (ValueError, TypeError):
+                pass
+        record_prices.append(price)
+
+        # Prescription index
+        if "Prescription" in entry:
+            prescription_index.setdefault(entry["Prescription"], []).append(record_id)
+
+        # Token index over the search document
+        for token in facts[record_id].tokens:
+            token_postings[token].append(record_id)
+
+    # Names: first-occurrence order, the name id of every record, and for the
+    # similarity bounds of fuzzy lookups the lowercased names as ids into
+    # their alphabet, stored column by column (every name's first letter,
+    # then second, ...) with the names ordered longest first
+    writer.add_postings("names", name_index, keep_order=True)
+    record_name_ids = array("i", [-1]) * len(medicines)
+    for position, record_ids in enumerate(name_index.values()):
+        for record_id in record_ids:
+            record_name_ids[record_id] = position
+    writer.add_array("record_name_ids", "i", record_name_ids)
+    names_lower = [med_name.lower() for med_name in name_index]
+    name_alphabet = sorted(set(chain.from_iterable(names_lower)))
+    letter_ids = {letter: letter_id for letter_id, letter in enumerate(name_alphabet)}
+    name_lengths = np.array([len(name) for name in names_lower], dtype=np.int64)
+    letters = np.fromiter((letter_ids[letter] for name in names_lower for letter in name),
+                          dtype=np.int64, count=int(name_lengths.sum()))
+    name_starts = np.cumsum(name_lengths) - name_lengths
+    name_order = np.argsort(-name_lengths, kind="stable")
+    longer = len(names_lower) - np.cumsum(np.bincount(name_lengths, minlength=1))
+    writer.add_strings("name_alphabet", name_alphabet)
+    writer.add_array("name_lengths", "i", name_lengths)
+    writer.add_array("name_length_order", "i", name_order)
+    writer.add_array("name_letter_columns.offsets", "q", np.concatenate(([0], np.cumsum(longer[:-1]))))
+    writer.add_array("name_letter_columns.values", "i", np.concatenate(
+        [letters[name_starts[name_order[:names]] + column] for column, names in enumerate(longer[:-1])] or [letters]
+    ))
+
+    writer.add_postings("manufacturers", manufacturer_index, keep_order=True)
+    writer.add_postings("prescriptions", prescription_index, keep_order=True)
+    writer.add_postings("compositions", composition_index)
+    writer.add_postings("canonical_compositions", canonical_index)
+    writer.add_strings("all_ingredients", sorted(all_ingredients))
+
+    # Distinct full compositions, with their lowercased text in the same order
+    # and its suffix array for substring matching
+    writer.add_postings("composition_groups", composition_groups, keep_order=True)
+    writer.add_strings("composition_groups_lower", (comp.lower() for comp in composition_groups))
+    writer.add_array("composition_suffixes", "i", SubstringIndex.build(writer.sections["composition_groups_lower.blob"][1]))
+
+    # Ingredients: sorted vocabulary, per-record ingredient ids (extraction
+    # order, duplicates kept) and the size of each record's ingredient set
+    writer.add_postings("ingredients", ingredient_postings)
+    ingredient_ids = {ingredient: position for position, ingredient in enumerate(sorted(ingredient_postings))}
+    writer.add_ragged("record_ingredients", ([ingredient_ids[i] for i in ingredients] for ingredients in record_ingredients))
+    writer.add_array("ingredient_set_sizes", "i", (len(set(ingredients)) for ingredients in record_ingredients))
+
+    # Top-ranked similar medicines and alternatives of every medicine
+    similar, alternatives = rank_alternatives(
+        [[ingredient_ids[i] for i in ingredients] for ingredients in record_ingredients],
+        record_name_ids,
+        record_prices
+    )
+    writer.add_ragged("similar_top", similar)
+    writer.add_ragged("alternatives_top", alternatives)
+    del similar, alternatives
+
+    writer.add_postings("tokens", token_postings)
+
+    # Prefix index over names, ingredients and manufacturers for autocomplete
+    build_autocomplete(writer, [
+        name_index.items(),
+        ((ingredient, ingredient_postings[ingredient]) for ingredient in sorted(ingredient_postings)),
+        manufacturer_index.items()
+    ], record_prices)
+
+    # Records as columns: string fields are ids into the tables above, MRP
+    # values are interned as JSON text, and each record's key order ("shape")
+    # is interned so records materialize with their original field order
+    manufacturer_ids = {manufacturer: position for position, manufacturer in enumerate(manufacturer_index)}
+    composition_ids = {comp: position for position, comp in enumerate(composition_groups)}
+    prescription_ids = {value: position for position, value in enumerate(prescription_index)}
+    shapes = {}
+    mrp_values = {}
+    record_shape_ids = array("i")
+    record_manufacturer_ids = array("i")
+    record_composition_ids = array("i")
+    record_mrp_ids = array("i")
+    record_prescription_ids = array("h")
+    record_extras = []
+    for entry in medicines:
+        record_shape_ids.append(shapes.setdefault(tuple(entry), len(shapes)))
+        record_manufacturer_ids.append(manufacturer_ids[entry["Manufacturer"]] if "Manufacturer" in entry else -1)
+        record_composition_ids.append(composition_ids[entry["Composition"]] if "Composition" in entry else -1)
+        if "MRP" in entry:
+            mrp = json.dumps(entry["MRP"], ensure_ascii=False)
+            record_mrp_ids.append(mrp_values.setdefault(mrp, len(mrp_values)))
+        else:
+            record_mrp_ids.append(-1)
+        record_prescription_ids.append(prescription_ids[entry["Prescription"]] if "Prescription" in entry else -1)
+        extras = {field: value for field, value in entry.items() if field not in COLUMN_FIELDS}
+        record_extras.append(json.dumps(extras, ensure_ascii=False) if extras else "")
+
+    writer.add_strings("record_shapes", (json.dumps(list(shape), ensure_ascii=False) for shape in shapes))
+    writer.add_strings("mrp_values", mrp_values)
+    writer.add_array("record_shape_ids", "i", record_shape_ids)
+    writer.add_array("record_manufacturer_ids", "i", record_manufacturer_ids)
+    writer.add_array("record_composition_ids", "i", record_composition_ids)
+    writer.add_array("record_mrp_ids", "i", record_mrp_ids)
+    writer.add_array("record_prescription_ids", "h", record_prescription_ids)
+    writer.add_strings("record_extras", record_extras)
+
+    # Parsed prices per record, and all finite prices sorted ascending with
+    # the record id of each price at the same position
+    writer.add_array("record_prices", "d", record_prices)
+    priced_records = sorted((price, record_id) for record_id, price in enumerate(record_prices) if math.isfinite(price))
+    writer.add_array("price_column", "d", (price for price, _ in priced_records))
+    writer.add_array("price_order", "i", (record_id for _, record_id in priced_records))
+
+    # Rank of each record when listed by price: finite prices ascending, then
+    # the records without a usable MRP (missing, invalid, infinite, or a falsy
+    # 0 or empty value) in catalogue order
+    listed = np.fromiter(
+        (record_id for price, record_id in priced_records if price or medicines[record_id]["MRP"]), dtype=np.int64
+    )
+    unlisted = np.ones(len(medicines), dtype=bool)
+    unlisted[listed] = False
+    price_ranks = np.empty(len(medicines), dtype=np.int64)
+    price_ranks[np.concatenate((listed, np.flatnonzero(unlisted)))] = np.arange(len(medicines))
+    writer.add_array("price_ranks", "i", price_ranks)
+
+    writer.add_strings("aggregates", build_aggregates(
+        len(medicines), manufacturer_index, prescription_index, record_prices, record_ingredients
+    ))
+
+    return writer.to_bytes(source), reused
+
+
+def source_stamp(path: str) -> Optional[List[int]]:
+    """Modification time and size of the source JSON, or None if it is missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def open_snapshot(path: str) -> Optional[Snapshot]:
+    """Memory-map a snapshot file, or return None if it is missing or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return Snapshot(buffer, path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        logger.info("Snapshot %s not usable: %s", path, exc)
+        return None
+
+
+def write_snapshot(path: str, buffer) -> None:
+    """Write snapshot bytes atomically (readers never see a partial file)."""
+    temp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(buffer)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class Catalogue:
+    """
+    The medicine records and every lookup index, read in place from a snapshot.
+    Records are identified by record id (their position in the catalogue) and
+    are only materialized as dicts when a tool returns them.
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        self.snapshot = snapshot
+        # Identifies the dataset the catalogue was built from (the source JSON's
+        # modification time and size)
+        self.version = ":".join(str(part) for part in snapshot.source or ())
+        self.documents = snapshot.strings("documents")
+
+        # Record columns
+        self.record_shapes = [tuple(json.loads(shape)) for shape in snapshot.strings("record_shapes")]
+        self.record_shape_ids = snapshot.array("record_shape_ids")
+        self.record_manufacturer_ids = snapshot.array("record_manufacturer_ids")
+        self.record_composition_ids = snapshot.array("record_composition_ids")
+        self.record_mrp_ids = snapshot.array("record_mrp_ids")
+        self.mrp_values = snapshot.strings("mrp_values")
+        self.record_prescription_ids = snapshot.array("record_prescription_ids")
+        self.record_extras = snapshot.strings("record_extras")
+        self.formatted_records = snapshot.strings("formatted_records")
+        self.record_digests = snapshot.array("record_digests")
+        self.record_count = len(self.record_shape_ids)
+
+        self.name_index = snapshot.postings("names")
+        self.record_name_ids = snapshot.array("record_name_ids")
+        self.name_alphabet = {letter: letter_id for letter_id, letter in enumerate(snapshot.strings("name_alphabet"))}
+        self.name_lengths = np.asarray(snapshot.array("name_lengths"))
+        self.name_length_order = np.asarray(snapshot.array("name_length_order"))
+        self.name_letter_columns = snapshot.ragged("name_letter_columns")
+
+        self.manufacturer_index = snapshot.postings("manufacturers")
+        self.prescription_index = snapshot.postings("prescriptions")
+        self.composition_index = snapshot.postings("compositions")
+        self.canonical_index = snapshot.postings("canonical_compositions")
+        self.composition_groups = snapshot.postings("composition_groups")
+        self.composition_groups_lower = snapshot.strings("composition_groups_lower")
+        self.composition_substrings = SubstringIndex(self.composition_groups_lower, snapshot.array("composition_suffixes"))
+        self.composition_records = IncidenceMatrix(
+            self.composition_groups.postings.offsets, self.composition_groups.postings.values, self.record_count
+        )
+        self.all_ingredients = snapshot.strings("all_ingredients")
+
+        self.ingredient_index = snapshot.postings("ingredients")
+        self.record_ingredients = snapshot.ragged("record_ingredients")
+        self.ingredient_set_sizes = snapshot.array("ingredient_set_sizes")
+        self.similar_top = snapshot.ragged("similar_top")
+        self.alternatives_top = snapshot.ragged("alternatives_top")
+
+        self.token_index = snapshot.postings("tokens")
+
+        # Autocomplete entries sorted by normalized key, with the stored top
+        # entries of long prefix ranges per ordering (see build_autocomplete)
+        self.autocomplete_keys = snapshot.strings("autocomplete_keys")
+        self.autocomplete_kinds = snapshot.array("autocomplete_kinds")
+        self.autocomplete_positions = snapshot.array("autocomplete_positions")
+        self.autocomplete_counts = snapshot.array("autocomplete_counts")
+        self.autocomplete_prices = snapshot.array("autocomplete_prices")
+        self.autocomplete_ranks = {name: snapshot.array(f"autocomplete_{name}_ranks") for name in ("popularity", "price")}
+        self.autocomplete_top = {name: snapshot.postings(f"autocomplete_{name}") for name in ("popularity", "price")}
+
+        self.record_prices = snapshot.array("record_prices")
+        # NumPy views of the same columns, and the record × ingredient incidence
+        # matrix in CSC form (the ingredient postings), for the vectorized scans
+        self.price_array = np.asarray(self.record_prices)
+        self.name_id_array = np.asarray(self.record_name_ids)
+        self.manufacturer_id_array = np.asarray(self.record_manufacturer_ids)
+        self.ingredient_set_size_array = np.asarray(self.ingredient_set_sizes)
+        self.ingredient_records = IncidenceMatrix(
+            self.ingredient_index.postings.offsets, self.ingredient_index.postings.values, self.record_count
+        )
+        self.price_column = snapshot.array("price_column")
+        self.price_order = snapshot.array("price_order")
+        self.price_rank_array = np.asarray(snapshot.array("price_ranks"))
+
+        # Statistics, manufacturer and category aggregates (see build_aggregates)
+        self.statistics_json, self.manufacturers_json, categories = snapshot.strings("aggregates")
+        self.categories = json.loads(categories)
+
+        # Filter bitmaps, built on first use (see index_bitmaps), and the query
+        # plans of this generation (see plan_search)
+        self.bitmaps = {}
+        self.plans = PlanCache(PLAN_CACHE_SIZE, PLAN_CACHE_BYTES)
+
+    # Records ---------------------------------------------------------------
+
+    def record(self, record_id: int) -> Dict[str, Any]:
+        """Materialize a record as the dict it was loaded from."""
+        record = {}
+        extras = None
+        for field in self.record_shapes[self.record_shape_ids[record_id]]:
+            if field == "Name":
+                record[field] = self.name_index.keys[self.record_name_ids[record_id]]
+            elif field == "Manufacturer":
+                record[field] = self.manufacturer_index.keys[self.record_manufacturer_ids[record_id]]
+            elif field == "Composition":
+                record[field] = self.composition_groups.keys[self.record_composition_ids[record_id]]
+            elif field == "MRP":
+                record[field] = json.loads(self.mrp_values[self.record_mrp_ids[record_id]])
+            elif field == "Prescription":
+                record[field] = self.prescription_index.keys[self.record_prescription_ids[record_id]]
+            else:
+                if extras is None:
+                    extras = json.loads(self.record_extras[record_id])
+                record[field] = extras[field]
+        return record
+
+    def cheapest(self, record_ids: np.ndarray, count: int) -> np.ndarray:
+        """
+        The first `count` of `record_ids` listed by price (see price_ranks),
+        cheapest first. Only those are ordered, so a page costs O(len(record_ids))
+        plus O(count log count) rather than a sort of every record.
+        """
+        ranks = self.price_rank_array[record_ids]
+        if count < len(ranks):
+            record_ids = record_ids[np.argpartition(ranks, count - 1)[:count]]
+            ranks = self.price_rank_array[record_ids]
+        return record_ids[np.argsort(ranks)]
+
+    def formatted(self, record_id: int) -> JSONFragment:
+        """format_medicine() output for a record, as precomputed JSON."""
+        return JSONFragment(self.formatted_records[record_id])
+
+    def digest_index(self) -> Dict[int, int]:
+        """Record id of every record digest (used to carry facts over on reload)."""
+        return {digest: record_id for record_id, digest in enumerate(self.record_digests)}
+
+    def record_facts(self, record_id: int) -> RecordFacts:
+        document = self.documents[record_id]
+        return RecordFacts(
+            self.record_digests[record_id],
+            document,
+            self.formatted_records[record_id],
+            frozenset(TOKEN_PATTERN.findall(document))
+        )
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Snapshot bytes per structure (sections grouped by name), largest first."""
+        sizes = defaultdict(int)
+        for name, (_, _, length) in self.snapshot.sections.items():
+            sizes[name.split(".")[0]] += length
+        return dict(sorted(sizes.items(), key=lambda x: x[1], reverse=True))
+
+    def find_record_id(self, name: str) -> Optional[int]:
+        """Record id for an exact Name (the last record when names repeat)."""
+        record_ids = self.name_index.get(name)
+        return record_ids[-1] if record_ids else None
+
+    # Fuzzy name lookups ----------------------------------------------------
+
+    def name_match_bounds(self, query_lower: str):
+        """
+        Upper bound, per name, on the characters SequenceMatcher can match
+        between `query_lower` and the lowercased name: their longest common
+        subsequence, which its matching blocks form. Computed for every name
+        at once with the bit-parallel LCS algorithm over the query's first
+        FUZZY_BOUND_CHARACTERS characters; each further one adds at most one.
+        """
+        head = query_lower[:FUZZY_BOUND_CHARACTERS]
+        masks = np.zeros(len(self.name_alphabet), dtype=np.uint64)
+        for bit, letter in enumerate(head):
+            letter_id = self.name_alphabet.get(letter)
+            if letter_id is not None:
+                masks[letter_id] |= np.uint64(1 << bit)
+        full = np.uint64((1 << len(head)) - 1)
+
+        # Names advance one letter per step. They are ordered longest first,
+        # so the names that still have a letter form a prefix of `rows`
+        count = len(self.name_lengths)
+        offsets = self.name_letter_columns.offsets
+        letters = np.asarray(self.name_letter_columns.values)
+        rows = np.full(count, full, dtype=np.uint64)
+        for column in range(len(offsets) - 1):
+            start, end = offsets[column], offsets[column + 1]
+            v = rows[:end - start]
+            u = v & masks[letters[start:end]]
+            rows[:end - start] = ((v + u) | (v - u)) & full
+        unmatched = np.unpackbits(rows.view(np.uint8)).reshape(count, 64).sum(axis=1)
+        bounds = np.empty(count, dtype=np.int64)
+        bounds[self.name_length_order] = len(query_lower) - unmatched
+        return bounds
+
+    def fuzzy_name_matches(self, query: str, threshold: float, limit: Optional[int] = None) -> List[tuple]:
+        """
+        Find names whose similarity_score with `query` is at least `threshold`.
+        Names are rescored exactly in descending order of an upper bound on
+        their score (see name_match_bounds) until no remaining name can reach
+        the threshold or displace the best `limit`, so the results are exactly
+        those of scoring every name.
+
+        Args:
+            query: The (possibly misspelled) medicine name.
+            threshold: Minimum similarity score (0.0-1.0).
+            limit: Number of best matches wanted (positive), or None for all.
+
+        Returns:
+            List of (score, name) tuples, best first; ties keep first-occurrence order.
+        """
+        query_lower = query.lower()
+        # ratio() is 2 * matches / total length, and 1.0 for two empty strings
+        totals = len(query_lower) + self.name_lengths
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bounds = np.where(totals > 0, 2.0 * self.name_match_bounds(query_lower) / totals, 1.0)
+        candidates = np.flatnonzero(bounds >= threshold)
+        candidates = candidates[np.lexsort((candidates, -bounds[candidates]))]
+
+        # Min-heap of the best (score, -position, name) so far
+        best = []
+        for position, bound in zip(candidates.tolist(), bounds[candidates].tolist()):
+            if limit is not None and len(best) >= limit and bound < best[0][0]:
+                break
+            med_name = self.name_index.keys[position]
+            score = SequenceMatcher(None, query_lower, med_name.lower()).ratio()
+            if score < threshold:
+                continue
+            if limit is None or len(best) < limit:
+                heapq.heappush(best, (score, -position, med_name))
+            else:
+                heapq.heappushpop(best, (score, -position, med_name))
+
+        best.sort(reverse=True)
+        return [(score, med_name) for score, _, med_name in best]
+
+    def closest_name(self, name: str, threshold: float = 0.8) -> Optional[str]:
+        """Resolve a misspelled medicine name to its closest match."""
+        matches = self.fuzzy_name_matches(name, threshold, limit=1)
+        return matches[0][1] if matches else None
+
+    # Ingredients -----------------------------------------------------------
+
+    def ingredient_set(self, record_id: int) -> frozenset:
+        """Distinct ingredient ids of a record."""
+        return frozenset(self.record_ingredients[record_id])
+
+    def ingredient_names(self, record_id: int) -> List[str]:
+        """The record's extracted ingredient names, in composition order."""
+        return [self.ingredient_index.keys[i] for i in self.record_ingredients[record_id]]
+
+    def shared_ingredient_counts(self, ingredient_ids: frozenset) -> tuple:
+        """
+        Count shared ingredients for every medicine that has at least one
+        ingredient in common with `ingredient_ids`: one sparse vector-matrix
+        product. Returns the record ids (catalogue order) and their counts.
+        """
+        rows = np.fromiter(ingredient_ids, dtype=np.int64, count=len(ingredient_ids))
+        return self.ingredient_records.row_sum(rows)
+
+    def batch_shared_ingredient_counts(self, ingredient_sets) -> Dict[frozenset, tuple]:
+        """shared_ingredient_counts of several ingredient sets, as one sparse matrix product."""
+        ingredient_sets = list(ingredient_sets)
+        queries = IncidenceMatrix.from_rows([sorted(ids) for ids in ingredient_sets], len(self.ingredient_index))
+        counts = {ids: (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)) for ids in ingredient_sets}
+        for start, end, rows, record_ids, values in queries.products(self.ingredient_records):
+            bounds = np.searchsorted(rows, np.arange(start, end + 1))
+            for row in range(start, end):
+                first, last = bounds[row - start], bounds[row - start + 1]
+                counts[ingredient_sets[row]] = (record_ids[first:last], values[first:last])
+        return counts
+
+    def ingredient_similarity(self, ref_ingredients: frozenset, record_id: int, intersection: int) -> float:
+        """Jaccard similarity from a precomputed intersection size."""
+        union = len(ref_ingredients) + self.ingredient_set_sizes[record_id] - intersection
+        return intersection / union
+
+    def ingredient_similarities(self, ref_ingredients: frozenset, record_ids, intersections):
+        """ingredient_similarity of many records at once (NumPy arrays in and out)."""
+        unions = len(ref_ingredients) + self.ingredient_set_size_array[record_ids] - intersections
+        return intersections / unions
+
+    def substitute_record_ids(self, composition: str):
+        """Record ids (catalogue order) with the same canonical composition."""
+        return self.canonical_index.get(canonical_composition(composition))
+
+    def composition_record_ids(self, substring: str) -> List[int]:
+        """
+        Record ids (catalogue order) whose lowercased Composition contains
+        `substring`: the distinct compositions matched through their suffix
+        array, expanded to their records.
+        """
+        record_ids, _ = self.composition_records.gather(self.composition_substrings.containing(substring))
+        return np.sort(record_ids).tolist()
+
+    def manufacturer_positions(self, substring: str) -> List[int]:
+        """Positions of the manufacturers whose lowercased name contains `substring`."""
+        return [
+            position for position, manufacturer in enumerate(self.manufacturer_index.keys)
+            if substring in manufacturer.lower()
+        ]
+
+    # Full-text search ------------------------------------------------------
+
+    def tokens_matching(self, fragment: str, prefix: bool, suffix: bool) -> List[int]:
+        """
+        Token ids a query fragment can fall inside.
+
+        Args:
+            fragment: A run of word characters from the (lowercased) query.
+            prefix: The fragment may be preceded by more characters of the token.
+            suffix: The fragment may be followed by more characters of the token.
+        """
+        tokens = self.token_index.keys
+        if not prefix and not suffix:
+            position = self.token_index.position(fragment)
+            return [] if position is None else [position]
+
+        if not prefix:
+            # Tokens starting with the fragment form a contiguous sorted range
+            start = bisect_left(tokens, fragment)
+            end = start
+            while end < len(tokens) and tokens[end].startswith(fragment):
+                end += 1
+            return list(range(start, end))
+
+        if suffix:
+            return tokens.containing(fragment)
+        # Tokens ending with the fragment: match it together with the separator
+        return tokens.find_indices((fragment + "\n").encode("utf-8"))
+
+    def search_candidates(self, query_lower: str) -> Optional[List[int]]:
+        """
+        Narrow the full-text search to records whose documents contain every
+        word run of the query, by intersecting posting lists.
+
+        Returns:
+            Sorted candidate record ids, or None when the index cannot narrow
+            the search cheaply (no word characters, or too many postings to merge).
+        """
+        runs = list(TOKEN_PATTERN.finditer(query_lower))
+        if not runs:
+            return None
+
+        postings = self.token_index.postings
+        candidate_sets = []
+        for run in runs:
+            # A run touching the query boundary may be part of a longer token
+            token_ids = self.tokens_matching(
+                run.group(),
+                prefix=run.start() == 0,
+                suffix=run.end() == len(query_lower)
+            )
+            if sum(postings.size(token_id) for token_id in token_ids) > self.record_count:
+                # Posting merge would cost more than scanning the documents
+                return None
+            ids = set()
+            for token_id in token_ids:
+                ids.update(postings[token_id])
+            if not ids:
+                return []
+            candidate_sets.append(ids)
+
+        candidate_sets.sort(key=len)
+        candidates = candidate_sets[0]
+        for ids in candidate_sets[1:]:
+            candidates = candidates.intersection(ids)
+        return sorted(candidates)
+
+    def search_record_ids(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """
+        Record ids (catalogue order) whose search document contains `query`
+        case-insensitively; stops after `limit` matches.
+        """
+        q = query.lower()
+        candidates = self.search_candidates(q)
+        if candidates is None:
+            # Exact-substring fallback over the precomputed documents
+            return self.documents.containing(q, limit)
+
+        record_ids = []
+        for record_id in candidates:
+            if q in self.documents[record_id]:
+                record_ids.append(record_id)
+                if limit is not None and len(record_ids) >= limit:
+                    break
+        return record_ids
+
+    def name_record_ids(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """
+        Record ids (catalogue order) whose name contains `query`
+        case-insensitively; stops after `limit` matches. A name is part of its
+        record's search document, so the token index narrows this search too.
+        """
+        q = query.lower()
+        candidates = self.search_candidates(q)
+        if candidates is None:
+            candidates = range(self.record_count)
+
+        names = self.name_index.keys
+        record_ids = []
+        for record_id in candidates:
+            name_id = self.record_name_ids[record_id]
+            # Records without a name have name id -1 and match only an empty query
+            if q in (names[name_id].lower() if name_id >= 0 else ""):
+                record_ids.append(record_id)
+                if limit is not None and len(record_ids) >= limit:
+                    break
+        return record_ids
+
+    # Prices ----------------------------------------------------------------
+
+    def price_range_ids(self, min_price: float, max_price: float):
+        """Record ids priced within [min_price, max_price], cheapest first."""
+        start = bisect_left(self.price_column, min_price)
+        end = bisect_right(self.price_column, max_price)
+        return self.price_order[start:end]
+
+    def autocomplete_ids(self, prefix: str, limit: int, ordering: str):
+        """
+        Autocomplete entry ids whose key starts with `prefix`, best first by
+        `ordering` ("popularity" or "price"). Long ranges are read from the
+        stored top entries; the rest are ranked here.
+        """
+        key = autocomplete_key(prefix)
+        top = self.autocomplete_top[ordering].get(key, None)
+        if top is not None and limit <= AUTOCOMPLETE_TOP_K:
+            return top[:limit]
+        start = bisect_left(self.autocomplete_keys, key)
+        end = bisect_left(self.autocomplete_keys, key + "\U0010ffff", start)
+        return heapq.nsmallest(limit, range(start, end), key=self.autocomplete_ranks[ordering].__getitem__)
+
+    def autocomplete_entry(self, entry_id: int) -> Dict[str, Any]:
+        """An autocomplete suggestion: the text, its kind, medicines covered and their lowest price."""
+        kind = self.autocomplete_kinds[entry_id]
+        vocabulary = (self.name_index, self.ingredient_index, self.manufacturer_index)[kind]
+        price = self.autocomplete_prices[entry_id]
+        return {
+            "text": vocabulary.keys[self.autocomplete_positions[entry_id]],
+            "type": AUTOCOMPLETE_KINDS[kind],
+            "medicine_count": self.autocomplete_counts[entry_id],
+            "lowest_price": price if price != math.inf else None
+        }
+
+    # Bitmaps ---------------------------------------------------------------
+    #
+    # A bitmap is a Python int with bit i set when record id i matches, so
+    # filters combine with & and |, and int.bit_count() counts the matches.
+
+    def bitmap(self, record_ids) -> int:
+        """Bitmap of `record_ids`."""
+        bits = np.zeros(self.record_count, dtype=bool)
+        bits[np.asarray(record_ids, dtype=np.int64)] = True
+        return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+    def bitmap_ids(self, bitmap: int) -> array:
+        """Record ids (catalogue order) set in `bitmap`."""
+        packed = np.frombuffer(bitmap.to_bytes((self.record_count + 7) // 8, "little"), dtype=np.uint8)
+        record_ids = array("i")
+        record_ids.frombytes(np.flatnonzero(np.unpackbits(packed, bitorder="little")).astype(np.intc).tobytes())
+        return record_ids
+
+    def price_bucket_starts(self) -> List[int]:
+        """
+        Position in the price column where each price bucket starts, followed
+        by the column length. A bucket is a non-empty PRICE_BUCKET_WIDTH band,
+        except the last of PRICE_BUCKET_LIMIT buckets, which runs to the end.
+        """
+        starts = self.bitmaps.get("price_bucket_starts")
+        if starts is None:
+            bands = np.floor_divide(np.asarray(self.price_column), PRICE_BUCKET_WIDTH)
+            starts = [0, *(np.flatnonzero(np.diff(bands)) + 1).tolist()] if len(bands) else []
+            starts = starts[:PRICE_BUCKET_LIMIT] + [len(bands)]
+            self.bitmaps["price_bucket_starts"] = starts
+        return starts
+
+    def index_bitmaps(self, name: str) -> List[int]:
+        """
+        One bitmap per key of a posting index ("manufacturer_index",
+        "prescription_index") or per price bucket ("price_buckets", see
+        price_bucket_starts), built once per catalogue generation.
+        """
+        bitmaps = self.bitmaps.get(name)
+        if bitmaps is None:
+            if name == "price_buckets":
+                starts = self.price_bucket_starts()
+                bitmaps = [self.bitmap(self.price_order[starts[b]:starts[b + 1]]) for b in range(len(starts) - 1)]
+            else:
+                postings = getattr(self, name).postings
+                bitmaps = [self.bitmap(postings[position]) for position in range(len(postings))]
+            # Concurrent first uses build identical lists; either one may win
+            self.bitmaps[name] = bitmaps
+        return bitmaps
+
+    def price_bitmap(self, min_price: float, max_price: float) -> int:
+        """Bitmap of the records priced within [min_price, max_price]."""
+        start = bisect_left(self.price_column, min_price)
+        end = bisect_right(self.price_column, max_price)
+        buckets = self.index_bitmaps("price_buckets")
+        starts = self.price_bucket_starts()
+
+        # Whole price buckets inside the range are OR-ed; the partial buckets
+        # at either end come from the sorted price column
+        first = bisect_left(starts, start)
+        last = bisect_right(starts, end) - 1
+        if first >= last:
+            return self.bitmap(self.price_order[start:end])
+        low_edge, high_edge = starts[first], starts[last]
+        bitmap = reduce(or_, buckets[first:last], 0)
+        bitmap |= self.bitmap(self.price_order[start:low_edge])
+        if high_edge < end:
+            bitmap |= self.bitmap(self.price_order[high_edge:end])
+        return bitmap
+
+
+def load_catalogue(data_path: str, snapshot_path: str) -> Catalogue:
+    """
+    Map the snapshot when it was built from the current JSON. If the JSON is
+    newer (or there is no usable snapshot), parse the JSON, rebuild the
+    snapshot and serve from the rebuilt one.
+    """
+    stamp = source_stamp(data_path)
+    snapshot = open_snapshot(snapshot_path)
+    if snapshot is not None and (stamp is None or snapshot.source == stamp):
+        return Catalogue(snapshot)
+
+    # A stale snapshot still lets unchanged records skip re-derivation
+    previous = Catalogue(snapshot) if snapshot is not None else None
+    return build_catalogue(data_path, snapshot_path, stamp, previous)[0]
+
+
+def build_catalogue(data_path: str, snapshot_path: str, stamp: Optional[List[int]],
+                    previous: Optional[Catalogue] = None) -> tuple:
+    """
+    Parse the JSON, build and write a new snapshot and open it.
+
+    Returns:
+        (new Catalogue, number of records reused from `previous`)
+    """
+    logger.info("Building snapshot %s from %s", snapshot_path, data_path)
+    with open(data_path, "r", encoding="utf-8") as f:
+        medicines: List[dict] = json.load(f)
+    buffer, reused = build_snapshot(medicines, stamp, previous)
+    logger.info("Built snapshot of %d medicines (%d unchanged records reused)", len(medicines), reused)
+    del medicines
+
+    try:
+        write_snapshot(snapshot_path, buffer)
+    except OSError as exc:
+        logger.warning("Could not write snapshot %s: %s", snapshot_path, exc)
+        return Catalogue(Snapshot(buffer)), reused
+    # Serve from the mapped file so its pages are shared with other processes
+    return Catalogue(open_snapshot(snapshot_path) or Snapshot(buffer)), reused
+
+
+# Query plans (matching record ids) cached per catalogue generation for
+# paginated_search and its cursors, bounded by count and by the size of
+# their record id arrays
+PLAN_CACHE_SIZE = 64
+PLAN_CACHE_BYTES = int(os.environ.get("MEDICINES_PLAN_CACHE_BYTES", str(4 * 1024 * 1024)))
+
+
+class PlanCache:
+    """
+    LRU cache of query plans, bounded by entry count and by the total size of
+    the plans. Each catalogue generation has its own, so cached plans never
+    outlive (or keep mapped) the generation they were made for.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # filters -> (plan, size)
+        self.bytes = 0
+
+    def get(self, key):
+        """Return the cached plan for `key`, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, plan):
+        """Cache `plan`, unless it alone exceeds the size limit."""
+        size = sys.getsizeof(plan)
+        with self.lock:
+            if size > self.max_bytes:
+                return
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry[1]
+            self.entries[key] = (plan, size)
+            self.bytes += size
+            # Evict least recently used plans until both limits hold
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.bytes -= evicted_size
+
+
+def plan_search(cat: Catalogue, query: str, manufacturer: str, min_price: float, max_price: float,
+                prescription_required: Optional[bool], ingredient: str):
+    """
+    Record ids (catalogue order) matching every paginated_search filter, as a
+    compact array (or a range), cached in the catalogue's PlanCache.
+    """
+    key = (query, manufacturer, min_price, max_price, prescription_required, ingredient)
+    plan = cat.plans.get(key)
+    if plan is None:
+        plan = resolve_plan(cat, *key)
+        cat.plans.put(key, plan)
+    return plan
+
+
+def resolve_plan(cat: Catalogue, query: str, manufacturer: str, min_price: float, max_price: float,
+                 prescription_required: Optional[bool], ingredient: str):
+    """
+    Record ids (catalogue order) matching every paginated_search filter.
+
+    The manufacturer, price, prescription and ingredient filters are each
+    resolved to a bitmap and AND-ed. The full-text query is the costliest
+    check, so it runs last, over whichever is smaller: the records left by
+    the bitmaps or the token-index candidates for the query.
+    """
+    bitmaps = []
+
+    if manufacturer:
+        manufacturer_bitmaps = cat.index_bitmaps("manufacturer_index")
+        bitmaps.append(reduce(or_, (manufacturer_bitmaps[p] for p in cat.manufacturer_positions(manufacturer.lower())), 0))
+
+    if min_price > 0 or max_price < float('inf'):
+        bitmaps.append(cat.price_bitmap(min_price, max_price))
+
+    if prescription_required is not None:
+        prescription_id = cat.prescription_index.position("Yes" if prescription_required else "No")
+        bitmaps.append(0 if prescription_id is None else cat.index_bitmaps("prescription_index")[prescription_id])
+
+    if ingredient:
+        # Matched as a substring of the composition, so this bitmap is built
+        # per search rather than kept per composition
+        bitmaps.append(cat.bitmap(cat.composition_record_ids(ingredient.lower())))
+
+    if not bitmaps:
+        return array("i", cat.search_record_ids(query)) if query else range(cat.record_count)
+
+    matches = reduce(and_, bitmaps)
+    if not query:
+        return cat.bitmap_ids(matches)
+
+    q = query.lower()
+    candidates = cat.search_candidates(q)
+    if candidates is not None and len(candidates) < matches.bit_count():
+        bits = matches.to_bytes((cat.record_count + 7) // 8, "little")
+        candidates = (record_id for record_id in candidates if bits[record_id >> 3] >> (record_id & 7) & 1)
+    else:
+        candidates = cat.bitmap_ids(matches)
+    return array("i", (record_id for record_id in candidates if q in cat.documents[record_id]))
+
+# Helper functions for opaque paginated_search cursors
+def search_signature(filters: tuple) -> str:
+    return hashlib.blake2b(json.dumps(filters).encode("utf-8"), digest_size=6).hexdigest()
+
+def encode_cursor(cat: Catalogue, filters: tuple, after: int) -> str:
+    """Cursor continuing a search after record id `after`, valid for this catalogue generation."""
+    token = json.dumps([cat.version, search_signature(filters), after])
+    return base64.urlsafe_b64encode(token.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, cat: Catalogue, filters: tuple) -> Optional[int]:
+    """Record id to continue after, or None if the cursor is malformed, for other filters or stale."""
+    try:
+        token = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        version, signature, after = json.loads(token)
+    except (ValueError, TypeError):
+        return None
+    if version != cat.version or signature != search_signature(filters) or not isinstance(after, int):
+        return None
+    return after
+
+def search_page(cat: Catalogue, query: str = "", page: int = 1, page_size: int = 10,
+                manufacturer: str = "", min_price: float = 0, max_price: float = float('inf'),
+                prescription_required: Optional[bool] = None, ingredient: str = "",
+                cursor: str = "") -> Union[Dict[str, Any], str]:
+    """
+    One page of a filtered search, for the paginated_search tool and the REST
+    /paginated_search endpoint.
+
+    Args:
+        cat: Catalogue generation to search.
+        query: General search term (searches across all fields).
+        page: Page number (starting from 1).
+        page_size: Number of results per page.
+        manufacturer: Filter by manufacturer (full or partial).
+        min_price: Minimum price filter.
+        max_price: Maximum price filter.
+        prescription_required: Filter by prescription requirement (None for any).
+        ingredient: Filter by active ingredient.
+        cursor: `meta.next_cursor` of the previous page; continues after that page (`page` is ignored).
+
+    Returns:
+        {"meta": ..., "results": [...]} with results as JSON fragments (encode
+        it with encode_response), or an error message for a bad cursor.
+    """
+    if page < 1:
+        page = 1
+    if page_size < 1:
+        page_size = 10
+    
+    # Matching record ids from the indices (cached, so later pages reuse them).
+    # Prices are floats however they were passed, so a cursor is valid in both front-ends
+    filters = (query, manufacturer, float(min_price), float(max_price), prescription_required, ingredient)
+    filtered_ids = plan_search(cat, *filters)
+    
+    # Calculate pagination
+    total_results = len(filtered_ids)
+    total_pages = math.ceil(total_results / page_size)
+    
+    if cursor:
+        after = decode_cursor(cursor, cat, filters)
+        if after is None:
+            return "Invalid or expired cursor. Repeat the search without a cursor."
+        # Keyset pagination: continue after the last record of the previous page
+        start_idx = bisect_right(filtered_ids, after)
+        page = start_idx // page_size + 1
+    else:
+        if page > total_pages and total_pages > 0:
+            page = total_pages
+        start_idx = (page - 1) * page_size
+    
+    end_idx = start_idx + page_size
+    page_ids = filtered_ids[start_idx:end_idx]
+    
+    return {
+        "meta": {
+            "total_results": total_results,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": total_pages,
+            "next_cursor": encode_cursor(cat, filters, page_ids[-1]) if end_idx < total_results else None
+        },
+        "results": [cat.formatted(record_id) for record_id in page_ids]
+    }
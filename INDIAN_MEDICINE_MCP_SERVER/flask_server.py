@@ -1,21 +1,100 @@
-from flask import Flask, request, jsonify
-import json
+from flask import Flask, Response, request, jsonify
+import logging
+import os
+import threading
+
+from engine import (
+    DATA_PATH, SNAPSHOT_PATH, Catalogue, Snapshot, build_snapshot, encode_response, load_catalogue,
+    search_page, source_stamp
+)
+
+logger = logging.getLogger("medicines-db")
 
 app = Flask(__name__)
 
-DATA_PATH = "/Users/siddharthbajpai/Downloads/MCP_SERVER/medicines.json"
+# The MCP server listens on 8001
+REST_PORT = int(os.environ.get("MEDICINES_REST_PORT", "8002"))
 
+# Most records /search returns
+SEARCH_LIMIT = 10
+
+# Same catalogue as the MCP server (server.py): both map the snapshot engine.py
+# builds from DATA_PATH, so the records and indices are one copy in the page
+# cache however many front-end processes serve them
 try:
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        medicines = json.load(f)
+    catalogue = load_catalogue(DATA_PATH, SNAPSHOT_PATH)
 except FileNotFoundError:
-    medicines = []
+    catalogue = Catalogue(Snapshot(build_snapshot([], None)[0]))
+
+# Stamp of the JSON the catalogue was last (re)loaded for, and the lock that
+# lets a single request thread reload it
+catalogue_stamp = source_stamp(DATA_PATH)
+catalogue_lock = threading.Lock()
+
+
+# Helper function to pick up an edited medicines.json (usually rebuilt into
+# the snapshot by the MCP server already, so this only maps the new file)
+def current_catalogue() -> Catalogue:
+    global catalogue, catalogue_stamp
+    stamp = source_stamp(DATA_PATH)
+    if stamp is None or stamp == catalogue_stamp:
+        return catalogue
+    with catalogue_lock:
+        if stamp != catalogue_stamp:
+            # Remembered even on failure, so a half-written file is not re-parsed per request
+            catalogue_stamp = stamp
+            try:
+                catalogue = load_catalogue(DATA_PATH, SNAPSHOT_PATH)
+            except Exception:
+                logger.exception("Catalogue reload failed; still serving the previous generation")
+    return catalogue
+
+
+# Helper function to read an optional yes/no query parameter
+def parse_flag(value):
+    if value is None or value == "":
+        return None
+    flag = value.strip().lower()
+    if flag in ("true", "yes", "1"):
+        return True
+    if flag in ("false", "no", "0"):
+        return False
+    raise ValueError(value)
+
 
 @app.route('/search', methods=['GET'])
 def search_medicines():
     query = request.args.get('query', '')
-    results = [med for med in medicines if query.lower() in med.get('Name', '').lower()]
-    return jsonify(results[:10])
+    cat = current_catalogue()
+    # Name matches, narrowed by the shared token index instead of a scan of every record
+    results = [cat.record(record_id) for record_id in cat.name_record_ids(query, limit=SEARCH_LIMIT)]
+    return jsonify(results)
+
+
+@app.route('/paginated_search', methods=['GET'])
+def paginated_search():
+    """Same filters, pages and cursors as the MCP paginated_search tool."""
+    args = request.args
+    try:
+        result = search_page(
+            current_catalogue(),
+            query=args.get('query', ''),
+            page=int(args.get('page', 1)),
+            page_size=int(args.get('page_size', 10)),
+            manufacturer=args.get('manufacturer', ''),
+            min_price=float(args.get('min_price', 0)),
+            max_price=float(args.get('max_price', 'inf')),
+            prescription_required=parse_flag(args.get('prescription_required')),
+            ingredient=args.get('ingredient', ''),
+            cursor=args.get('cursor', '')
+        )
+    except ValueError as exc:
+        return jsonify({"error": f"Invalid parameter value: {exc}"}), 400
+
+    if isinstance(result, str):
+        return jsonify({"error": result}), 400
+    return Response(encode_response(result), mimetype="application/json")
+
 
 if __name__ == '__main__':
-    app.run(port=8001)
+    app.run(port=REST_PORT)
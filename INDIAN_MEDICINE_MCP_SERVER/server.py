@@ -1,247 +1,968 @@
+import asyncio
+import cProfile
+import gc
+import heapq
 import json
-import re
-from typing import Any, List, Dict, Optional, Union
-from dataclasses import dataclass
-from difflib import SequenceMatcher
-from collections import Counter, defaultdict
+import logging
 import math
+import mmap
+import multiprocessing
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from typing import Any, List, Dict, Optional, Union
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial, wraps
+from inspect import signature
+import numpy as np
 from mcp.server.fastmcp import FastMCP
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+
+# The catalogue, its snapshot and indices live in engine.py, shared with the REST API
+from engine import (
+    ALTERNATIVES_TOP_K, AUTOCOMPLETE_TOP_K, DATA_PATH, SNAPSHOT_FORMAT_VERSION,
+    SNAPSHOT_PATH, Catalogue, autocomplete_key, build_catalogue, canonical_composition,
+    encode_response, load_catalogue, parse_composition, search_page,
+    shortlist, similarity_score, source_stamp, top_k
+)
+
+logger = logging.getLogger("medicines-db")
 
 # 1) Initialize your MCP server with a descriptive name
 mcp = FastMCP("medicines-db")
 
-# 2) Load the large JSON file once at startup
-DATA_PATH = "/Users/siddharthbajpai/Downloads/MCP_SERVER/medicines.json"
-with open(DATA_PATH, "r", encoding="utf-8") as f:
-    medicines: List[dict] = json.load(f)
-
-# 3) Create multiple indices for fast lookups
-name_index = {entry["Name"]: entry for entry in medicines if "Name" in entry}
-manufacturer_index = defaultdict(list)
-composition_index = defaultdict(list)
-price_index = defaultdict(list)
-prescription_index = {"Yes": [], "No": []}
-
-# Build all indices
-for entry in medicines:
-    # Manufacturer index
-    if "Manufacturer" in entry:
-        manufacturer_index[entry["Manufacturer"]].append(entry)
-    
-    # Composition index (split by '+' to index individual components)
-    if "Composition" in entry:
-        full_comp = entry["Composition"]
-        # Index the full composition
-        composition_index[full_comp].append(entry)
-        # Index individual components
-        for component in full_comp.split("+"):
-            component = component.strip()
-            # Extract the active ingredient name (removing dosage info)
-            match = re.search(r"([\w\s-]+)\s*\(", component)
-            if match:
-                ingredient = match.group(1).strip()
-                composition_index[ingredient].append(entry)
-    
-    # Price range index (buckets of 100)
-    if "MRP" in entry:
+# Poll the JSON for changes every N seconds and reload it (0 disables the watcher)
+WATCH_INTERVAL_SECONDS = float(os.environ.get("MEDICINES_WATCH_INTERVAL_SECONDS", "0"))
+
+# Tool result cache limits (0 entries disables the cache, 0 seconds disables expiry)
+CACHE_MAX_ENTRIES = int(os.environ.get("MEDICINES_CACHE_MAX_ENTRIES", "2048"))
+CACHE_MAX_BYTES = int(os.environ.get("MEDICINES_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL_SECONDS = float(os.environ.get("MEDICINES_CACHE_TTL_SECONDS", "3600"))
+
+# Serve HTTP from N forked worker processes sharing the loaded catalogue (0 or 1 = single process)
+PREFORK_WORKERS = int(os.environ.get("MEDICINES_PREFORK_WORKERS", "0"))
+HTTP_PORT = 8001
+
+# Where MCP calls to expensive tools run: "thread" or "process" pools keep the
+# event loop free, "inline" runs them on it. Tool calls are CPU-bound, so only
+# processes spread them over cores; threads share the GIL and are the default
+# on a single core or when pre-forked workers already occupy the cores. At
+# most WORKER_QUEUE_LIMIT calls are in flight; further calls are turned away
+# until one finishes.
+DEFAULT_WORKER_MODE = "process" if (os.cpu_count() or 1) > 1 and PREFORK_WORKERS <= 1 else "thread"
+WORKER_MODE = os.environ.get("MEDICINES_WORKER_MODE", DEFAULT_WORKER_MODE)
+WORKER_COUNT = int(os.environ.get("MEDICINES_WORKERS", str(os.cpu_count() or 1)))
+WORKER_QUEUE_LIMIT = int(os.environ.get("MEDICINES_WORKER_QUEUE", str(WORKER_COUNT * 8)))
+
+# Tool calls slower than this many milliseconds are logged with their arguments
+# (0 disables the slow-query log), to MEDICINES_SLOW_QUERY_LOG if set
+SLOW_QUERY_MS = float(os.environ.get("MEDICINES_SLOW_QUERY_MS", "1000"))
+SLOW_QUERY_LOG = os.environ.get("MEDICINES_SLOW_QUERY_LOG", "")
+
+# Profiling at startup: calls to these tools (comma-separated) plus a random
+# share of all calls run under cProfile, optionally tracing allocations. It is
+# normally switched on and off at runtime with configure_profiling instead.
+PROFILE_TOOLS = [name for name in os.environ.get("MEDICINES_PROFILE_TOOLS", "").split(",") if name]
+PROFILE_SAMPLE_RATE = float(os.environ.get("MEDICINES_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TRACE_MEMORY = os.environ.get("MEDICINES_PROFILE_TRACE_MEMORY", "0") == "1"
+
+# Upper bounds (seconds) of the per-tool latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+
+# Load the catalogue at startup. Reloads replace this global with a new
+# generation; tools read it once into a local (`cat`) so that every call runs
+# against a single generation even if a reload swaps it mid-call.
+catalogue = load_catalogue(DATA_PATH, SNAPSHOT_PATH)
+
+
+class ResultCache:
+    """
+    LRU cache of tool results, keyed by tool name and bound arguments (defaults
+    filled in). It is bounded by entry count and by the size of the cached
+    strings, entries expire after `ttl` seconds, and the whole cache is dropped
+    when the catalogue's dataset version changes.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float, version):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version = version
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (result, size, expires_at)
+        self.bytes = 0
+        self.dataset_version = version()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.tool_counts = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    def get(self, key):
+        """Return the cached result for `key`, or None."""
+        with self.lock:
+            if self.dataset_version != self.version():
+                self.clear()
+                self.dataset_version = self.version()
+                self.invalidations += 1
+
+            entry = self.entries.get(key)
+            if entry is not None and self.ttl and entry[2] < time.monotonic():
+                self.discard(key)
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                self.tool_counts[key[0]]["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.tool_counts[key[0]]["hits"] += 1
+            return entry[0]
+
+    def put(self, key, result: str, version: str):
+        """Cache `result`, unless the dataset changed while it was computed."""
+        size = sys.getsizeof(result)
+        with self.lock:
+            if version != self.dataset_version or size > self.max_bytes:
+                return
+            self.discard(key)
+            self.entries[key] = (result, size, time.monotonic() + self.ttl)
+            self.bytes += size
+            # Evict least recently used entries until both limits hold
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self.discard(next(iter(self.entries)))
+                self.evictions += 1
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "dataset_version": self.dataset_version,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "by_tool": {name: dict(counts) for name, counts in sorted(self.tool_counts.items())}
+            }
+
+    @staticmethod
+    def key(fn, fn_signature, args, kwargs):
+        """Cache key of a call, or None when the arguments are unhashable."""
+        bound = fn_signature.bind(*args, **kwargs)
+        bound.apply_defaults()
         try:
-            price = float(entry["MRP"])
-            bucket = math.floor(price / 100) * 100
-            price_index[bucket].append(entry)
-        except (ValueError, TypeError):
-            pass
-    
-    # Prescription index
-    if "Prescription" in entry:
-        prescription_index[entry["Prescription"]].append(entry)
-
-# Extract unique active ingredients for better search
-all_ingredients = set()
-for entry in medicines:
-    if "Composition" in entry:
-        components = entry["Composition"].split("+")
-        for component in components:
-            match = re.search(r"([\w\s-]+)\s*\(", component)
-            if match:
-                all_ingredients.add(match.group(1).strip())
-
-# Helper function for similarity matching
-def similarity_score(a: str, b: str) -> float:
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
-
-# Helper function to extract active ingredients from composition
-def extract_ingredients(composition: str) -> List[str]:
-    ingredients = []
-    if not composition:
-        return ingredients
-        
-    components = composition.split("+")
-    for component in components:
-        match = re.search(r"([\w\s-]+)\s*\(", component)
-        if match:
-            ingredients.append(match.group(1).strip())
+            key = (fn.__name__, tuple(bound.arguments.items()))
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def wrap(self, fn):
+        """Serve `fn`'s results from the cache; arguments are normalized by binding them."""
+        fn_signature = signature(fn)
+
+        @wraps(fn)
+        def cached(*args, **kwargs):
+            key = self.key(fn, fn_signature, args, kwargs)
+            if key is None:
+                # Unhashable arguments are not cached
+                return fn(*args, **kwargs)
+
+            result = self.get(key)
+            if result is None:
+                version = catalogue.version
+                result = fn(*args, **kwargs)
+                self.put(key, result, version)
+            return result
+
+        return cached
+
+
+result_cache = ResultCache(CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_TTL_SECONDS, lambda: catalogue.version)
+
+# ---------------------------------------------------------------------------
+# Tool metrics
+# ---------------------------------------------------------------------------
+slow_query_logger = logging.getLogger("medicines-db.slow")
+if SLOW_QUERY_LOG:
+    slow_query_handler = logging.FileHandler(SLOW_QUERY_LOG, encoding="utf-8")
+    slow_query_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    slow_query_logger.addHandler(slow_query_handler)
+
+
+class ToolResponse(str):
+    """
+    A tool's JSON response, carrying the number of results in it (records,
+    matches, groups) as counted where the payload was built. Tools answer
+    with a plain string for text replies such as "not found".
+    """
+    results = 0
+
+
+# Helper function to encode a tool's JSON response with its result count
+# (`payload` may be JSON text already)
+def json_response(payload: Any, results: int) -> ToolResponse:
+    response = ToolResponse(payload if isinstance(payload, str) else encode_response(payload))
+    response.results = results
+    return response
+
+
+class ToolMetrics:
+    """
+    Per-tool counters of MCP calls: a latency histogram, results and
+    response bytes returned, text replies (no results or invalid input) and
+    calls that raised. Latency covers the whole call as a client sees it,
+    including cache hits and time spent waiting for a worker.
+    """
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        # tool -> [bucket counts (last is +Inf), calls, seconds, results, bytes, text replies, errors]
+        self.tools = defaultdict(lambda: [[0] * (len(buckets) + 1), 0, 0.0, 0, 0, 0, 0])
+
+    def observe(self, name: str, seconds: float, result: Optional[str]):
+        """Record one call; `result` is None when the call raised."""
+        if result is not None:
+            results = result.results if isinstance(result, ToolResponse) else None
+            size = len(result.encode("utf-8"))
+        with self.lock:
+            counters = self.tools[name]
+            counters[0][bisect_left(self.buckets, seconds)] += 1
+            counters[1] += 1
+            counters[2] += seconds
+            if result is None:
+                counters[6] += 1
+                return
+            if results is None:
+                counters[5] += 1
+            else:
+                counters[3] += results
+            counters[4] += size
+
+    def instrument(self, fn):
+        """Wrap a tool callable registered with FastMCP (sync or async) so its calls are recorded."""
+        name = fn.__name__
+        fn_signature = signature(fn)
+
+        def record(started: float, result: Optional[str], args: tuple, kwargs: dict):
+            seconds = time.perf_counter() - started
+            self.observe(name, seconds, result)
+            if SLOW_QUERY_MS > 0 and seconds * 1000 >= SLOW_QUERY_MS:
+                bound = fn_signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                slow_query_logger.warning("Slow call to %s (%.1f ms): %s", name, seconds * 1000,
+                                          json.dumps(bound.arguments, ensure_ascii=False, default=str))
+
+        if asyncio.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def instrumented(*args, **kwargs):
+                started = time.perf_counter()
+                result = None
+                try:
+                    result = await fn(*args, **kwargs)
+                    return result
+                finally:
+                    record(started, result, args, kwargs)
         else:
-            # If pattern doesn't match, use the whole component
-            ingredients.append(component.strip())
-    return ingredients
+            @wraps(fn)
+            def instrumented(*args, **kwargs):
+                started = time.perf_counter()
+                result = None
+                try:
+                    result = fn(*args, **kwargs)
+                    return result
+                finally:
+                    record(started, result, args, kwargs)
+        return instrumented
 
-# Helper function to format medicine record for display
-def format_medicine(medicine: Dict[str, Any]) -> Dict[str, Any]:
-    """Format a medicine record for better display, adding derived fields."""
-    result = medicine.copy()
-    
-    # Add formatted price if available
-    if "MRP" in result:
+    def render(self) -> List[str]:
+        """Prometheus text exposition lines for every tool called so far."""
+        with self.lock:
+            tools = sorted((name, [list(counters[0])] + counters[1:]) for name, counters in self.tools.items())
+
+        lines = [
+            "# HELP medicines_tool_latency_seconds Latency of MCP tool calls.",
+            "# TYPE medicines_tool_latency_seconds histogram",
+        ]
+        for name, (buckets, calls, seconds, *_) in tools:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), buckets):
+                cumulative += count
+                lines.append(f'medicines_tool_latency_seconds_bucket{{tool="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'medicines_tool_latency_seconds_sum{{tool="{name}"}} {seconds:.6f}')
+            lines.append(f'medicines_tool_latency_seconds_count{{tool="{name}"}} {calls}')
+
+        for metric, position, description in (
+            ("medicines_tool_results_total", 3, "Results (records, matches, groups) returned by MCP tool calls."),
+            ("medicines_tool_response_bytes_total", 4, "UTF-8 bytes of MCP tool responses."),
+            ("medicines_tool_text_replies_total", 5, "MCP tool calls answered with a text message (no results or invalid input)."),
+            ("medicines_tool_errors_total", 6, "MCP tool calls that raised an exception."),
+        ):
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f'{metric}{{tool="{name}"}} {counters[position]}' for name, counters in tools)
+        return lines
+
+
+tool_metrics = ToolMetrics(LATENCY_BUCKETS)
+
+# ---------------------------------------------------------------------------
+# Profiling
+# ---------------------------------------------------------------------------
+# cProfile can only profile one call at a time on Python 3.12+, and a single
+# profiled call keeps its allocation peak readable
+profile_lock = threading.Lock()
+
+
+def profile_call(fn, args: tuple, kwargs: dict, trace_memory: bool) -> tuple:
+    """
+    Run `fn` under cProfile and, with `trace_memory`, tracemalloc.
+
+    Returns:
+        (result, profile) where profile is (function stats, seconds, peak
+        allocated bytes or None), or None if another call was being profiled
+    """
+    if not profile_lock.acquire(blocking=False):
+        return fn(*args, **kwargs), None
+    try:
+        started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        elif trace_memory:
+            tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0] if trace_memory else 0
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        profile.enable()
         try:
-            price = float(result["MRP"])
-            result["Price_INR"] = f"₹{price:.2f}"
-            
-            # Add price category
-            if price < 50:
-                result["Price_Category"] = "Low"
-            elif price < 200:
-                result["Price_Category"] = "Medium"
-            elif price < 500:
-                result["Price_Category"] = "High"
+            result = fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            seconds = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] - baseline if trace_memory else None
+            if started_tracing:
+                tracemalloc.stop()
+    finally:
+        profile_lock.release()
+
+    # Callers are dropped: they are large and the report only ranks functions
+    stats = {function: entry[:4] for function, entry in pstats.Stats(profile).stats.items()}
+    return result, (stats, seconds, peak)
+
+
+class Profiler:
+    """
+    Opt-in profiling of tool calls, switched at runtime (configure_profiling)
+    without a restart. Every call to a selected tool, plus a random share of
+    all calls, runs under profile_call; the function stats and allocation
+    peaks are summed per tool into a hot-function report.
+    """
+
+    def __init__(self, tools: List[str], sample_rate: float, trace_memory: bool):
+        self.lock = threading.Lock()
+        self.tool_profiles = {}
+        self.configure(tools, sample_rate, trace_memory)
+
+    def configure(self, tools: List[str], sample_rate: float, trace_memory: bool, reset: bool = False):
+        with self.lock:
+            self.tools = frozenset(tools)
+            self.sample_rate = sample_rate
+            self.trace_memory = trace_memory
+            if reset:
+                self.tool_profiles = {}
+
+    def settings(self) -> Dict[str, Any]:
+        return {"tools": sorted(self.tools), "sample_rate": self.sample_rate, "trace_memory": self.trace_memory}
+
+    def selected(self, name: str) -> bool:
+        """Whether this call to `name` should be profiled."""
+        return name in self.tools or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def record(self, name: str, profile: Optional[tuple]):
+        """Add one call's profile (None if it could not be profiled) to the tool's totals."""
+        with self.lock:
+            totals = self.tool_profiles.setdefault(name, {
+                "calls": 0, "skipped": 0, "seconds": 0.0, "peaks": [], "functions": defaultdict(lambda: [0, 0, 0.0, 0.0])
+            })
+            if profile is None:
+                totals["skipped"] += 1
+                return
+            stats, seconds, peak = profile
+            totals["calls"] += 1
+            totals["seconds"] += seconds
+            if peak is not None:
+                totals["peaks"].append(peak)
+            for function, entry in stats.items():
+                function_totals = totals["functions"][function]
+                for position, value in enumerate(entry):
+                    function_totals[position] += value
+
+    def wrap(self, fn):
+        """Profile the calls to `fn` selected by the current settings."""
+        @wraps(fn)
+        def profiled(*args, **kwargs):
+            if not self.selected(fn.__name__):
+                return fn(*args, **kwargs)
+            result, profile = profile_call(fn, args, kwargs, self.trace_memory)
+            self.record(fn.__name__, profile)
+            return result
+
+        return profiled
+
+    def report(self, name: str = "", top: int = 20, sort: str = "self") -> Dict[str, Any]:
+        """Per-tool hot functions, ranked by self or cumulative time."""
+        position = 3 if sort == "cumulative" else 2
+        with self.lock:
+            tools = {tool_name: totals for tool_name, totals in self.tool_profiles.items() if not name or tool_name == name}
+            report = {}
+            for tool_name, totals in sorted(tools.items()):
+                seconds = totals["seconds"]
+                ranked = heapq.nlargest(top, totals["functions"].items(), key=lambda x: x[1][position])
+                report[tool_name] = {
+                    "profiled_calls": totals["calls"],
+                    "skipped_calls": totals["skipped"],
+                    "profiled_seconds": round(seconds, 6),
+                    "peak_allocated_bytes": {
+                        "max": max(totals["peaks"]),
+                        "mean": round(sum(totals["peaks"]) / len(totals["peaks"]))
+                    } if totals["peaks"] else None,
+                    "hot_functions": [
+                        {
+                            "function": pstats.func_std_string(function).replace(os.path.dirname(__file__) + os.sep, ""),
+                            "calls": calls,
+                            "self_seconds": round(self_seconds, 6),
+                            "cumulative_seconds": round(cumulative_seconds, 6),
+                            "self_percent": round(100 * self_seconds / seconds, 1) if seconds else None
+                        }
+                        for function, (_, calls, self_seconds, cumulative_seconds) in ranked
+                    ]
+                }
+        return {"settings": self.settings(), "tools": report}
+
+
+profiler = Profiler(PROFILE_TOOLS, PROFILE_SAMPLE_RATE, PROFILE_TRACE_MEMORY)
+
+# ---------------------------------------------------------------------------
+# Worker pool
+# ---------------------------------------------------------------------------
+# Undecorated functions of every registered tool by name (worker processes
+# run tools from here)
+tool_functions: Dict[str, Any] = {}
+
+
+def run_tool(name: str, version: str, args: tuple, kwargs: dict, profile: bool = False,
+             trace_memory: bool = False):
+    """
+    Run a tool in a worker process. Workers import this module and map the
+    same snapshot file, so the catalogue's pages are shared with the server
+    rather than copied; after a reload the worker maps the new generation.
+    With `profile`, returns profile_call's (result, profile) for the server
+    to record.
+    """
+    global catalogue
+    if catalogue.version != version:
+        catalogue = load_catalogue(DATA_PATH, SNAPSHOT_PATH)
+    if profile:
+        return profile_call(tool_functions[name], args, kwargs, trace_memory)
+    return tool_functions[name](*args, **kwargs)
+
+
+class WorkerPool:
+    """
+    Runs MCP tool calls in a thread or process pool so that a slow call does
+    not stall the event loop, with at most `queue_limit` calls in flight.
+    Cached results are answered on the event loop without a pool round trip.
+    """
+
+    def __init__(self, mode: str, workers: int, queue_limit: int):
+        self.mode = mode
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.executor = None
+        self.in_flight = 0
+        self.rejected = 0
+
+    def get_executor(self):
+        # Created on first use, after the snapshot is current, so worker
+        # processes only map it
+        if self.executor is None:
+            if self.mode == "process":
+                self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
             else:
-                result["Price_Category"] = "Premium"
-                
-        except (ValueError, TypeError):
-            pass
-            
-    # Extract and add active ingredients list
-    if "Composition" in result:
-        result["Active_Ingredients"] = extract_ingredients(result["Composition"])
-        
-        # Number of ingredients
-        result["Ingredient_Count"] = len(result["Active_Ingredients"])
-        
-        # Check if combination medicine (more than one ingredient)
-        result["Is_Combination"] = result["Ingredient_Count"] > 1
-        
-    # Add prescription requirement in plain language
-    if "Prescription" in result:
-        if result["Prescription"] == "Yes":
-            result["Requires_Prescription"] = True
-            result["Prescription_Type"] = "Prescription Required"
+                self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="tool-worker")
+        return self.executor
+
+    def offload(self, fn, cache: bool):
+        """Async twin of `fn` for registration with FastMCP."""
+        fn_signature = signature(fn)
+
+        @wraps(fn)
+        async def offloaded(*args, **kwargs):
+            key = result_cache.key(fn, fn_signature, args, kwargs) if cache else None
+            if key is not None:
+                result = result_cache.get(key)
+                if result is not None:
+                    return result
+
+            # The counter is only touched on the event loop
+            if self.in_flight >= self.queue_limit:
+                self.rejected += 1
+                return "Server busy: too many requests in progress. Please retry shortly."
+
+            version = catalogue.version
+            # Profiling is decided here so that calls run in worker processes
+            # are recorded by the server's profiler
+            profile = profiler.selected(fn.__name__)
+            if self.mode == "process":
+                call = partial(run_tool, fn.__name__, version, args, kwargs, profile, profiler.trace_memory)
+            elif profile:
+                call = partial(profile_call, fn, args, kwargs, profiler.trace_memory)
+            else:
+                call = partial(fn, *args, **kwargs)
+            self.in_flight += 1
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(self.get_executor(), call)
+            finally:
+                self.in_flight -= 1
+
+            if profile:
+                result, call_profile = result
+                profiler.record(fn.__name__, call_profile)
+            if key is not None:
+                result_cache.put(key, result, version)
+            return result
+
+        return offloaded
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected
+        }
+
+
+worker_pool = WorkerPool(WORKER_MODE, WORKER_COUNT, WORKER_QUEUE_LIMIT)
+
+# Helper function to register a tool, by default behind the result cache and,
+# for MCP calls, in the worker pool
+def tool(cache: bool = True, offload: bool = True):
+    """
+    Like mcp.tool(); results of tools registered with cache=True are cached,
+    and MCP calls to tools registered with offload=True run in the worker
+    pool. Every MCP call is recorded in tool_metrics, and calls selected by
+    the profiler are profiled. The decorated function itself stays a plain
+    synchronous function.
+    """
+    def decorator(fn):
+        tool_functions[fn.__name__] = fn
+        profiled = profiler.wrap(fn)
+        cached = result_cache.wrap(profiled) if cache and CACHE_MAX_ENTRIES > 0 else profiled
+        if offload and WORKER_MODE != "inline":
+            mcp.tool()(tool_metrics.instrument(worker_pool.offload(fn, cache and CACHE_MAX_ENTRIES > 0)))
         else:
-            result["Requires_Prescription"] = False
-            result["Prescription_Type"] = "Over-the-Counter"
-            
-    return result
+            mcp.tool()(tool_metrics.instrument(cached))
+        return cached
+    return decorator
 
-@mcp.tool()
-def get_medicine_by_name(name: str, include_alternatives: bool = True) -> str:
+# ---------------------------------------------------------------------------
+# Hot reload
+# ---------------------------------------------------------------------------
+reload_lock = threading.Lock()
+reload_status: Dict[str, Any] = {"state": "idle", "last_reload": None, "last_error": None}
+
+
+def reload_catalogue(force: bool = False) -> Dict[str, Any]:
     """
-    Retrieve a medicine record by its exact Name, with optional cheaper alternatives.
-    
+    Build a new catalogue generation from the JSON and swap it in atomically.
+    Unchanged records reuse the current generation's per-record facts, but the
+    indices are reassembled over every record, so the cost is O(records), not
+    O(changed records). Calls already running finish against the generation
+    they started with.
+
     Args:
-        name: The exact Name field of the medicine.
-        include_alternatives: Whether to include cheaper alternatives in results.
-        
+        force: Rebuild even if the JSON has not changed.
+
     Returns:
-        JSON-encoded record with alternatives, or an error message.
+        Summary of the reload.
     """
-    entry = name_index.get(name)
-    if not entry:
+    global catalogue
+    with reload_lock:
+        current = catalogue
+        stamp = source_stamp(DATA_PATH)
+        if stamp is None:
+            raise FileNotFoundError(DATA_PATH)
+        if not force and current.snapshot.source == stamp:
+            return {"reloaded": False, "dataset_version": current.version}
+
+        reload_status["state"] = "building"
+        started = time.perf_counter()
+        try:
+            new_catalogue, reused = build_catalogue(DATA_PATH, SNAPSHOT_PATH, stamp, current)
+        except Exception as exc:
+            reload_status["last_error"] = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            reload_status["state"] = "idle"
+
+        # Rebinding the global is atomic; the result cache notices the new version
+        catalogue = new_catalogue
+        result = {
+            "reloaded": True,
+            "dataset_version": new_catalogue.version,
+            "previous_dataset_version": current.version,
+            "total_medicines": new_catalogue.record_count,
+            "reused_records": reused,
+            "rebuilt_records": new_catalogue.record_count - reused,
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+        reload_status["last_reload"] = result
+        reload_status["last_error"] = None
+        logger.info("Reloaded catalogue: %s", result)
+        return result
+
+
+def reload_in_background(force: bool = False) -> bool:
+    """Start a reload thread unless a reload is already running."""
+    if reload_lock.locked():
+        return False
+
+    def run():
+        try:
+            reload_catalogue(force)
+        except Exception:
+            logger.exception("Catalogue reload failed; still serving the previous generation")
+
+    threading.Thread(target=run, name="catalogue-reload", daemon=True).start()
+    return True
+
+
+def watch_catalogue(interval: float):
+    """Reload whenever the JSON's modification time or size changes."""
+    while True:
+        time.sleep(interval)
+        stamp = source_stamp(DATA_PATH)
+        if stamp is not None and stamp != catalogue.snapshot.source and not reload_lock.locked():
+            try:
+                reload_catalogue()
+            except Exception:
+                # A half-written file fails to parse; retry on the next poll
+                logger.exception("Catalogue reload failed; still serving the previous generation")
+
+
+# Helper function to look up a medicine (closest name as a fallback) with its
+# cheaper alternatives, for get_medicine_by_name and get_medicines_by_names
+def medicine_details(cat: Catalogue, name: str, include_alternatives: bool = True,
+                     shared_counts=None) -> Union[Dict[str, Any], str]:
+    """
+    get_medicine_by_name's response as a dict, or an error message.
+    `shared_counts` stands in for cat.shared_ingredient_counts (batches
+    count it for all their medicines at once).
+    """
+    if shared_counts is None:
+        shared_counts = cat.shared_ingredient_counts
+    
+    entry_id = cat.find_record_id(name)
+    if entry_id is None:
         # Try fuzzy match if exact match fails
-        best_match = None
-        best_score = 0
-        
-        for med_name in name_index:
-            score = similarity_score(name, med_name)
-            if score > best_score and score >= 0.8:
-                best_score = score
-                best_match = med_name
+        best_match = cat.closest_name(name)
                 
         if best_match:
-            entry = name_index[best_match]
+            entry_id = cat.find_record_id(best_match)
+            entry = cat.record(entry_id)
             result = {
                 "note": f"Exact medicine not found. Showing closest match: '{best_match}'",
-                "medicine": format_medicine(entry)
+                "medicine": cat.formatted(entry_id)
             }
         else:
             return f"Medicine named '{name}' not found."
     else:
-        result = {"medicine": format_medicine(entry)}
+        entry = cat.record(entry_id)
+        result = {"medicine": cat.formatted(entry_id)}
     
     # Automatically include cheaper alternatives if requested
     if include_alternatives and "MRP" in entry:
         try:
             med_price = float(entry["MRP"])
-            ref_ingredients = []
+            ref_ingredients = cat.ingredient_set(entry_id)
+            ref_name_id = cat.record_name_ids[entry_id]
             
-            if "Composition" in entry:
-                ref_ingredients = extract_ingredients(entry["Composition"])
+            def describe(alt_id: int) -> Dict[str, Any]:
+                alt_price = cat.record_prices[alt_id]
+                intersection = len(ref_ingredients.intersection(cat.record_ingredients[alt_id]))
+                similarity = cat.ingredient_similarity(ref_ingredients, alt_id, intersection)
+                return {
+                    "medicine": cat.formatted(alt_id),
+                    "price_savings": f"₹{med_price - alt_price:.2f}",
+                    "savings_percentage": f"{((med_price - alt_price) / med_price) * 100:.1f}%",
+                    "similarity_score": f"{similarity:.2f}"
+                }
             
-            cheaper_alternatives = []
-            similar_composition_alternatives = []
+            # Only medicines sharing an ingredient can reach the similarity cut-offs;
+            # of those, the cheaper ones under another name (NaN prices never compare cheaper)
+            alt_ids, intersections = shared_counts(ref_ingredients)
+            alt_prices = cat.price_array[alt_ids]
+            keep = (cat.name_id_array[alt_ids] != ref_name_id) & (alt_prices < med_price)
+            alt_ids, intersections, alt_prices = alt_ids[keep], intersections[keep], alt_prices[keep]
+            similarities = cat.ingredient_similarities(ref_ingredients, alt_ids, intersections)
             
-            for alt in medicines:
-                if alt["Name"] == entry["Name"]:
-                    continue
-                    
-                if "MRP" not in alt:
-                    continue
-                    
-                try:
-                    alt_price = float(alt["MRP"])
-                    
-                    # Check if it's cheaper
-                    if alt_price < med_price:
-                        formatted_alt = format_medicine(alt)
-                        
-                        # Check composition similarity if we have reference ingredients
-                        if ref_ingredients and "Composition" in alt:
-                            alt_ingredients = extract_ingredients(alt["Composition"])
-                            
-                            if alt_ingredients:
-                                # Calculate Jaccard similarity
-                                set1 = set(ref_ingredients)
-                                set2 = set(alt_ingredients)
-                                
-                                intersection = len(set1.intersection(set2))
-                                union = len(set1.union(set2))
-                                
-                                if union > 0:
-                                    similarity = intersection / union
-                                    
-                                    # If similar composition and cheaper, it's a great alternative
-                                    if similarity >= 0.7:
-                                        cheaper_alternatives.append({
-                                            "medicine": formatted_alt,
-                                            "price_savings": f"₹{med_price - alt_price:.2f}",
-                                            "savings_percentage": f"{((med_price - alt_price) / med_price) * 100:.1f}%",
-                                            "similarity_score": f"{similarity:.2f}"
-                                        })
-                                    # If somewhat similar, keep track separately
-                                    elif similarity >= 0.4:
-                                        similar_composition_alternatives.append({
-                                            "medicine": formatted_alt,
-                                            "price_savings": f"₹{med_price - alt_price:.2f}",
-                                            "savings_percentage": f"{((med_price - alt_price) / med_price) * 100:.1f}%",
-                                            "similarity_score": f"{similarity:.2f}"
-                                        })
-                except (ValueError, TypeError):
-                    continue
+            # If similar composition and cheaper, it's a great alternative; if
+            # somewhat similar, keep track separately
+            cheaper = similarities >= 0.7
+            similar = ~cheaper & (similarities >= 0.4)
             
-            # Sort alternatives by savings (highest first)
+            # Sort alternatives by savings (highest first). Responses sort on the
+            # rounded percentage, so only the medicines that can round into the
+            # top 5 are formatted and sorted
+            savings = (med_price - alt_prices[cheaper]) / med_price * 100
+            candidates = alt_ids[cheaper]
+            if math.isfinite(med_price):
+                candidates = candidates[shortlist(savings, 5, 0.2)]
+            cheaper_alternatives = [describe(alt_id) for alt_id in candidates.tolist()]
             cheaper_alternatives.sort(key=lambda x: float(x["savings_percentage"].rstrip('%')), reverse=True)
-            similar_composition_alternatives.sort(key=lambda x: float(x["similarity_score"]), reverse=True)
-            
             result["cheaper_alternatives"] = cheaper_alternatives[:5]  # Top 5 cheapest with similar composition
             
             # If we have few or no high-similarity alternatives, include some with lower similarity
-            if len(cheaper_alternatives) < 3:
+            if np.count_nonzero(cheaper) < 3:
+                candidates = alt_ids[similar][shortlist(similarities[similar], 3, 0.02)]
+                similar_composition_alternatives = [describe(alt_id) for alt_id in candidates.tolist()]
+                similar_composition_alternatives.sort(key=lambda x: float(x["similarity_score"]), reverse=True)
                 result["similar_composition_alternatives"] = similar_composition_alternatives[:3]
                 
         except (ValueError, TypeError):
             # If price parsing fails, skip alternatives
             pass
     
-    return json.dumps(result, ensure_ascii=False)
+    return result
+
+# Helper function to rank alternatives to a medicine, for suggest_alternatives
+# and suggest_alternatives_batch
+def medicine_alternatives(cat: Catalogue, medicine_name: str, max_suggestions: int = 5,
+                          shared_counts=None) -> Union[Dict[str, Any], str]:
+    """
+    suggest_alternatives' response as a dict, or an error message.
+    `shared_counts` stands in for cat.shared_ingredient_counts (batches
+    count it for all their medicines at once).
+    """
+    if shared_counts is None:
+        shared_counts = cat.shared_ingredient_counts
+    
+    reference_id = cat.find_record_id(medicine_name)
+    if reference_id is None:
+        # Try fuzzy match
+        best_match = cat.closest_name(medicine_name)
+                
+        if best_match:
+            reference_id = cat.find_record_id(best_match)
+            medicine_name = best_match  # Update to the matched name
+        else:
+            return f"Medicine '{medicine_name}' not found."
+    reference = cat.record(reference_id)
+    
+    if "Composition" not in reference:
+        return f"Cannot suggest alternatives - no composition data for '{medicine_name}'."
+    
+    if "MRP" not in reference:
+        return f"Cannot suggest alternatives - no price data for '{medicine_name}'."
+    
+    try:
+        ref_price = float(reference["MRP"])
+    except (ValueError, TypeError):
+        ref_price = math.nan
+    # An infinite MRP leaves no price to compare alternatives with
+    if not math.isfinite(ref_price):
+        return f"Cannot suggest alternatives - invalid price data for '{medicine_name}'."
+    
+    # Get medicines with similar composition
+    ref_ingredients = cat.ingredient_set(reference_id)
+    if not ref_ingredients:
+        return f"Cannot suggest alternatives - unable to parse ingredients for '{medicine_name}'."
+    
+    def describe(record_id: int, similarity: float) -> Dict[str, Any]:
+        entry_price = cat.record_prices[record_id]
+        # Calculate price difference percentage (undefined for a free reference)
+        if ref_price == 0:
+            price_diff_pct = None
+            cheaper = entry_price < ref_price
+        else:
+            price_diff_pct = ((entry_price - ref_price) / ref_price) * 100
+            cheaper = price_diff_pct < 0
+        return {
+            "medicine": cat.formatted(record_id),
+            "ingredient_similarity": similarity,
+            "price_difference_percentage": price_diff_pct,
+            "price_comparison": "cheaper" if cheaper else "more expensive",
+            "absolute_price_difference": abs(entry_price - ref_price)
+        }
+    
+    alternatives = []
+    if 0 <= max_suggestions <= ALTERNATIVES_TOP_K:
+        # Ranked when the snapshot was built (see rank_alternatives)
+        ranked = cat.alternatives_top[reference_id]
+        for record_id in ranked[:max_suggestions]:
+            intersection = len(ref_ingredients.intersection(cat.record_ingredients[record_id]))
+            alternatives.append(describe(record_id, cat.ingredient_similarity(ref_ingredients, record_id, intersection)))
+        found = len(ranked)
+    else:
+        # Skip the reference medicine and records without a valid, finite MRP
+        record_ids, intersections = shared_counts(ref_ingredients)
+        prices = cat.price_array[record_ids]
+        keep = (cat.name_id_array[record_ids] != cat.record_name_ids[reference_id]) & np.isfinite(prices)
+        record_ids, intersections, prices = record_ids[keep], intersections[keep], prices[keep]
+        
+        # At least 50% similar ingredients
+        similarities = cat.ingredient_similarities(ref_ingredients, record_ids, intersections)
+        similar = similarities >= 0.5
+        record_ids, similarities, prices = record_ids[similar], similarities[similar], prices[similar]
+        
+        # Sort by similarity and then by price (cheaper first); only the
+        # suggestions returned are ranked and described
+        limit = max_suggestions if max_suggestions >= 0 else len(record_ids) + max_suggestions
+        for position in top_k(similarities, limit, ties=np.abs(prices - ref_price)).tolist():
+            alternatives.append(describe(int(record_ids[position]), float(similarities[position])))
+        found = len(record_ids)
+    
+    result = {
+        "reference_medicine": cat.formatted(reference_id),
+        "alternatives": alternatives
+    }
+    
+    if not found:
+        result["message"] = f"No suitable alternatives found for '{medicine_name}'."
+    
+    return result
+
+# Largest number of names accepted by the batch tools
+MAX_BATCH_SIZE = 200
+
+# Helper function to count shared ingredients for a whole batch at once
+def batch_shared_counts(cat: Catalogue, names: List[str]):
+    """
+    A stand-in for cat.shared_ingredient_counts whose results for the batch's
+    exactly-named medicines come from one sparse matrix product; other
+    ingredient sets (fuzzy matches) are counted on demand, once each.
+    """
+    record_ids = (cat.find_record_id(name) for name in set(names[:MAX_BATCH_SIZE]))
+    counts = cat.batch_shared_ingredient_counts({cat.ingredient_set(r) for r in record_ids if r is not None})
+    fallback = lru_cache(maxsize=None)(cat.shared_ingredient_counts)
+    return lambda ingredient_ids: counts[ingredient_ids] if ingredient_ids in counts else fallback(ingredient_ids)
+
+# Helper function to run a per-name lookup over a batch of names
+def resolve_batch(names: List[str], lookup) -> Union[Dict[str, Any], str]:
+    """
+    Apply `lookup(name)` (a response dict or an error message) once per
+    distinct name and collect per-item results and errors in input order.
+    A lookup that raises is reported as that item's error.
+    """
+    if len(names) > MAX_BATCH_SIZE:
+        return f"Too many names: {len(names)} (at most {MAX_BATCH_SIZE} per batch)."
+    
+    resolved = {}
+    items = []
+    for name in names:
+        if name not in resolved:
+            try:
+                resolved[name] = lookup(name)
+            except Exception as exc:
+                logger.exception("Batch lookup of %r failed", name)
+                resolved[name] = f"Lookup failed for '{name}': {exc}"
+        result = resolved[name]
+        if isinstance(result, str):
+            items.append({"name": name, "error": result})
+        else:
+            items.append({"name": name, "result": result})
+    
+    errors = sum(1 for item in items if "error" in item)
+    return {
+        "total_items": len(items),
+        "found": len(items) - errors,
+        "errors": errors,
+        "items": items
+    }
+
+# Helper function to read a process's resident, shared, private and peak memory
+def process_memory(pid: Union[int, str] = "self") -> Dict[str, Optional[int]]:
+    """
+    Current resident set size of a process (this one by default), split into
+    pages shared with other processes (the snapshot mapping, pages inherited
+    from a pre-fork parent and not yet written) and pages private to it, its
+    proportional share (PSS) and, for this process, peak RSS, in bytes.
+    Values are None where the platform does not report them.
+    """
+    usage = {"rss_bytes": None, "shared_bytes": None, "private_bytes": None, "pss_bytes": None, "peak_rss_bytes": None}
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            usage["rss_bytes"] = int(f.read().split()[1]) * mmap.PAGESIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        rollup = defaultdict(int)
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                field, _, value = line.partition(":")
+                if value.strip().endswith("kB"):
+                    rollup[field] += int(value.split()[0]) * 1024
+        usage["shared_bytes"] = rollup["Shared_Clean"] + rollup["Shared_Dirty"]
+        usage["private_bytes"] = rollup["Private_Clean"] + rollup["Private_Dirty"]
+        usage["pss_bytes"] = rollup["Pss"]
+    except (OSError, ValueError, IndexError):
+        pass
+    if pid == "self":
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+            usage["peak_rss_bytes"] = peak if sys.platform == "darwin" else peak * 1024
+        except ImportError:
+            pass
+    return usage
+
+@tool()
+def get_medicine_by_name(name: str, include_alternatives: bool = True) -> str:
+    """
+    Retrieve a medicine record by its exact Name, with optional cheaper alternatives.
+    
+    Args:
+        name: The exact Name field of the medicine.
+        include_alternatives: Whether to include cheaper alternatives in results.
+        
+    Returns:
+        JSON-encoded record with alternatives, or an error message.
+    """
+    result = medicine_details(catalogue, name, include_alternatives)
+    return result if isinstance(result, str) else json_response(result, 1)
 
-@mcp.tool()
+@tool()
 def search_medicines(query: str, max_results: int = 10) -> str:
     """
     Full-text search across all medicine fields.
@@ -253,21 +974,16 @@ def search_medicines(query: str, max_results: int = 10) -> str:
     Returns:
         JSON-encoded list of matches, or a not-found message.
     """
-    q = query.lower()
-    results = []
-    for entry in medicines:
-        # flatten entry to a single string for simple search
-        if q in json.dumps(entry, ensure_ascii=False).lower():
-            results.append(format_medicine(entry))
-        if len(results) >= max_results:
-            break
+    cat = catalogue
+    # Match against the precomputed search documents, narrowed by the token index
+    results = [cat.formatted(record_id) for record_id in cat.search_record_ids(query, limit=max_results)]
     
     if not results:
         return f"No medicines found containing '{query}'."
     
-    return json.dumps(results, ensure_ascii=False)
+    return json_response(results, len(results))
 
-@mcp.tool()
+@tool()
 def fuzzy_search_by_name(partial_name: str, similarity_threshold: float = 0.6, max_results: int = 10) -> str:
     """
     Search for medicines with names similar to the provided partial name using fuzzy matching.
@@ -280,30 +996,27 @@ def fuzzy_search_by_name(partial_name: str, similarity_threshold: float = 0.6, m
     Returns:
         JSON-encoded list of matches sorted by similarity, or a not-found message.
     """
+    cat = catalogue
     if not partial_name or len(partial_name) < 3:
         return "Please provide at least 3 characters for fuzzy search."
         
-    scored_results = []
-    for med_name, entry in name_index.items():
-        score = similarity_score(partial_name, med_name)
-        if score >= similarity_threshold:
-            scored_results.append((score, format_medicine(entry)))
-    
-    # Sort by similarity score (descending)
-    scored_results.sort(reverse=True, key=lambda x: x[0])
+    # Names scoring at least the threshold with similarity_score, sorted by score (descending)
+    scored_results = cat.fuzzy_name_matches(
+        partial_name, similarity_threshold, limit=max_results if max_results > 0 else None
+    )
     
     # Limit results
     top_results = [
-        {"similarity_score": f"{score:.2f}", "medicine": entry} 
-        for score, entry in scored_results[:max_results]
+        {"similarity_score": f"{score:.2f}", "medicine": cat.formatted(cat.find_record_id(med_name))}
+        for score, med_name in scored_results[:max_results]
     ]
     
     if not top_results:
         return f"No medicines found with names similar to '{partial_name}'."
     
-    return json.dumps(top_results, ensure_ascii=False)
+    return json_response(top_results, len(top_results))
 
-@mcp.tool()
+@tool()
 def search_by_composition(ingredient: str, max_results: int = 10) -> str:
     """
     Search for medicines containing a specific active ingredient.
@@ -315,44 +1028,40 @@ def search_by_composition(ingredient: str, max_results: int = 10) -> str:
     Returns:
         JSON-encoded list of medicines containing the ingredient, or a not-found message.
     """
+    cat = catalogue
     results = []
     
     # Try exact match first
-    if ingredient in composition_index:
-        results = composition_index[ingredient][:max_results]
+    if ingredient in cat.composition_index:
+        results = cat.composition_index[ingredient][:max_results]
     else:
-        # Try substring search in all compositions
-        q = ingredient.lower()
-        for entry in medicines:
-            if "Composition" in entry and q in entry["Composition"].lower():
-                results.append(entry)
-            if len(results) >= max_results:
-                break
+        # Try substring search in all (distinct) compositions
+        results = cat.composition_record_ids(ingredient.lower())[:max_results]
     
     if not results:
         # Try fuzzy matching for ingredient names
         best_match = None
         best_score = 0
         
-        for known_ingredient in all_ingredients:
+        for known_ingredient in cat.all_ingredients:
             score = similarity_score(ingredient, known_ingredient)
             if score > best_score and score >= 0.7:
                 best_score = score
                 best_match = known_ingredient
                 
-        if best_match and best_match in composition_index:
-            results = composition_index[best_match][:max_results]
-            return json.dumps({
+        if best_match and best_match in cat.composition_index:
+            results = cat.composition_index[best_match][:max_results]
+            return json_response({
                 "note": f"No exact match found. Showing results for similar ingredient: '{best_match}'",
-                "matches": [format_medicine(r) for r in results]
-            }, ensure_ascii=False)
+                "matches": [cat.formatted(r) for r in results]
+            }, len(results))
     
     if not results:
         return f"No medicines found containing ingredient '{ingredient}'."
     
-    return json.dumps([format_medicine(r) for r in results], ensure_ascii=False)
+    return json_response([cat.formatted(r) for r in results], len(results))
 
-@mcp.tool()
+@tool()
 def filter_by_price_range(min_price: float = 0, max_price: float = float('inf'), max_results: int = 20) -> str:
     """
     Filter medicines by price range.
@@ -363,30 +1072,18 @@ def filter_by_price_range(min_price: float = 0, max_price: float = float('inf'),
         max_results: Maximum number of matching records to return.
         
     Returns:
-        JSON-encoded list of medicines within the price range, or a not-found message.
+        JSON-encoded list of medicines within the price range (cheapest first), or a not-found message.
     """
-    results = []
-    
-    for entry in medicines:
-        if "MRP" in entry:
-            try:
-                price = float(entry["MRP"])
-                if min_price <= price <= max_price:
-                    results.append(format_medicine(entry))
-                if len(results) >= max_results:
-                    break
-            except (ValueError, TypeError):
-                continue
+    cat = catalogue
+    # The sorted price column yields the cheapest matches first
+    results = [cat.formatted(record_id) for record_id in cat.price_range_ids(min_price, max_price)[:max_results]]
     
     if not results:
         return f"No medicines found in price range ₹{min_price:.2f} - ₹{max_price:.2f}."
     
-    # Sort by price
-    results.sort(key=lambda x: float(x["MRP"]) if "MRP" in x and x["MRP"] else float('inf'))
-    
-    return json.dumps(results, ensure_ascii=False)
+    return json_response(results, len(results))
 
-@mcp.tool()
+@tool()
 def filter_by_manufacturer(manufacturer: str, max_results: int = 20) -> str:
     """
     Filter medicines by manufacturer.
@@ -398,16 +1095,17 @@ def filter_by_manufacturer(manufacturer: str, max_results: int = 20) -> str:
     Returns:
         JSON-encoded list of medicines from the manufacturer, or a not-found message.
     """
+    cat = catalogue
     # First try exact match
     results = []
-    if manufacturer in manufacturer_index:
-        results = manufacturer_index[manufacturer][:max_results]
+    if manufacturer in cat.manufacturer_index:
+        results = list(cat.manufacturer_index[manufacturer][:max_results])
     else:
         # Try partial match
         manufacturer_lower = manufacturer.lower()
-        for mfr, entries in manufacturer_index.items():
+        for mfr, record_ids in cat.manufacturer_index.items():
             if manufacturer_lower in mfr.lower():
-                results.extend(entries)
+                results.extend(record_ids)
                 if len(results) >= max_results:
                     results = results[:max_results]
                     break
@@ -415,9 +1113,9 @@ def filter_by_manufacturer(manufacturer: str, max_results: int = 20) -> str:
     if not results:
         return f"No medicines found from manufacturer '{manufacturer}'."
     
-    return json.dumps([format_medicine(r) for r in results], ensure_ascii=False)
+    return json_response([cat.formatted(r) for r in results], len(results))
 
-@mcp.tool()
+@tool()
 def filter_by_prescription_requirement(prescription_required: bool, max_results: int = 20) -> str:
     """
     Filter medicines by prescription requirement.
@@ -429,16 +1127,17 @@ def filter_by_prescription_requirement(prescription_required: bool, max_results:
     Returns:
         JSON-encoded list of medicines with the specified prescription requirement.
     """
+    cat = catalogue
     key = "Yes" if prescription_required else "No"
-    results = prescription_index.get(key, [])[:max_results]
+    results = cat.prescription_index.get(key)[:max_results]
     
     if not results:
         status = "prescription" if prescription_required else "non-prescription"
         return f"No {status} medicines found."
     
-    return json.dumps([format_medicine(r) for r in results], ensure_ascii=False)
+    return json_response([cat.formatted(r) for r in results], len(results))
 
-@mcp.tool()
+@tool()
 def find_similar_medicines(medicine_name: str, max_results: int = 5) -> str:
     """
     Find medicines with similar composition to the specified medicine.
@@ -450,139 +1149,84 @@ def find_similar_medicines(medicine_name: str, max_results: int = 5) -> str:
     Returns:
         JSON-encoded list of similar medicines, or an error message.
     """
-    reference = name_index.get(medicine_name)
-    if not reference:
+    cat = catalogue
+    reference_id = cat.find_record_id(medicine_name)
+    if reference_id is None:
         # Try fuzzy match
-        best_match = None
-        best_score = 0
-        
-        for med_name in name_index:
-            score = similarity_score(medicine_name, med_name)
-            if score > best_score and score >= 0.8:
-                best_score = score
-                best_match = med_name
+        best_match = cat.closest_name(medicine_name)
                 
         if best_match:
-            reference = name_index[best_match]
+            reference_id = cat.find_record_id(best_match)
             medicine_name = best_match  # Update to the matched name
         else:
             return f"Medicine '{medicine_name}' not found."
+    reference = cat.record(reference_id)
     
     if "Composition" not in reference:
         return f"Cannot find similar medicines - no composition data for '{medicine_name}'."
     
     # Get the ingredients from the reference medicine
-    ref_ingredients = extract_ingredients(reference["Composition"])
+    ref_ingredients = cat.ingredient_set(reference_id)
     if not ref_ingredients:
         return f"Cannot find similar medicines - unable to parse ingredients for '{medicine_name}'."
     
-    # Score all other medicines by ingredient similarity
     similar_meds = []
-    for entry in medicines:
-        if entry["Name"] == medicine_name:
-            continue  # Skip the reference medicine
-            
-        if "Composition" not in entry:
-            continue
-            
-        entry_ingredients = extract_ingredients(entry["Composition"])
-        
-        # Calculate Jaccard similarity (intersection over union)
-        set1 = set(ref_ingredients)
-        set2 = set(entry_ingredients)
-        
-        if not set2:
-            continue
-            
-        intersection = len(set1.intersection(set2))
-        union = len(set1.union(set2))
+    if 0 <= max_results <= ALTERNATIVES_TOP_K:
+        # Ranked when the snapshot was built (see rank_alternatives)
+        ranked = cat.similar_top[reference_id]
+        for record_id in ranked[:max_results]:
+            intersection = len(ref_ingredients.intersection(cat.record_ingredients[record_id]))
+            similar_meds.append((cat.ingredient_similarity(ref_ingredients, record_id, intersection), record_id))
+        found = len(ranked)
+    else:
+        # Score the medicines sharing at least one ingredient (any ingredient
+        # match), skipping the reference medicine
+        record_ids, intersections = cat.shared_ingredient_counts(ref_ingredients)
+        keep = cat.name_id_array[record_ids] != cat.record_name_ids[reference_id]
+        record_ids, intersections = record_ids[keep], intersections[keep]
         
-        if union > 0:
-            similarity = intersection / union
-            if similarity > 0:  # Any ingredient match
-                similar_meds.append((similarity, entry))
-    
-    # Sort by similarity (descending)
-    similar_meds.sort(reverse=True, key=lambda x: x[0])
+        # Jaccard similarity (intersection over union), highest first
+        similarities = cat.ingredient_similarities(ref_ingredients, record_ids, intersections)
+        limit = max_results if max_results >= 0 else len(record_ids) + max_results
+        for position in top_k(similarities, limit).tolist():
+            similar_meds.append((float(similarities[position]), int(record_ids[position])))
+        found = len(record_ids)
     
     result = {
-        "reference_medicine": format_medicine(reference),
+        "reference_medicine": cat.formatted(reference_id),
         "similar_medicines": [
             {
                 "similarity_score": f"{score:.2f}",
-                "medicine": format_medicine(med)
+                "medicine": cat.formatted(record_id)
             }
-            for score, med in similar_meds[:max_results]
+            for score, record_id in similar_meds
         ]
     }
     
-    if not similar_meds:
+    if not found:
         result["message"] = f"No medicines with similar composition to '{medicine_name}' found."
     
-    return json.dumps(result, ensure_ascii=False)
+    return json_response(result, len(similar_meds))
 
-@mcp.tool()
+@tool(offload=False)
 def get_medicine_statistics() -> str:
     """
-    Get statistical overview of the medicines database.
+    Get statistical overview of the medicines database. The statistics are
+    precomputed for each dataset generation and recomputed in full on reload.
     
     Returns:
         JSON-encoded statistics about the medicines database.
     """
-    stats = {
-        "total_medicines": len(medicines),
-        "prescription_count": len(prescription_index.get("Yes", [])),
-        "otc_count": len(prescription_index.get("No", [])),
-        "unknown_prescription_status": len(medicines) - len(prescription_index.get("Yes", [])) - len(prescription_index.get("No", [])),
-        "manufacturer_counts": dict(Counter(med["Manufacturer"] for med in medicines if "Manufacturer" in med).most_common(10)),
-        "price_distribution": {
-            "min_price": None,
-            "max_price": None,
-            "avg_price": None,
-            "price_ranges": {}
-        }
-    }
-    
-    # Price statistics
-    prices = []
-    price_ranges = defaultdict(int)
-    
-    for entry in medicines:
-        if "MRP" in entry:
-            try:
-                price = float(entry["MRP"])
-                prices.append(price)
-                
-                # Price distribution in ranges of 100
-                range_key = f"₹{math.floor(price/100)*100} - ₹{math.floor(price/100)*100 + 99.99}"
-                price_ranges[range_key] += 1
-                
-            except (ValueError, TypeError):
-                continue
-    
-    if prices:
-        stats["price_distribution"]["min_price"] = f"₹{min(prices):.2f}"
-        stats["price_distribution"]["max_price"] = f"₹{max(prices):.2f}"
-        stats["price_distribution"]["avg_price"] = f"₹{sum(prices)/len(prices):.2f}"
-        stats["price_distribution"]["price_ranges"] = dict(sorted(price_ranges.items()))
-    
-    # Common active ingredients
-    ingredient_counter = Counter()
-    for entry in medicines:
-        if "Composition" in entry:
-            ingredients = extract_ingredients(entry["Composition"])
-            ingredient_counter.update(ingredients)
-    
-    stats["common_ingredients"] = dict(ingredient_counter.most_common(10))
-    
-    return json.dumps(stats, ensure_ascii=False)
+    # Computed once per dataset generation when the snapshot is built (over
+    # every record, however few a reload changed)
+    return json_response(catalogue.statistics_json, 1)
 
-@mcp.tool()
+@tool()
 def paginated_search(query: str = "", page: int = 1, page_size: int = 10, 
                     manufacturer: str = "", min_price: float = 0, 
                     max_price: float = float('inf'), 
                     prescription_required: Optional[bool] = None,
-                    ingredient: str = "") -> str:
+                    ingredient: str = "", cursor: str = "") -> str:
     """
     Advanced search with pagination and multiple filters.
     
@@ -595,78 +1239,19 @@ def paginated_search(query: str = "", page: int = 1, page_size: int = 10,
         max_price: Maximum price filter.
         prescription_required: Filter by prescription requirement (None for any).
         ingredient: Filter by active ingredient.
+        cursor: `meta.next_cursor` of the previous page; continues after that page (`page` is ignored).
         
     Returns:
         JSON-encoded paginated results with meta information.
     """
-    if page < 1:
-        page = 1
-    if page_size < 1:
-        page_size = 10
-    
-    # Start with all medicines
-    filtered_results = medicines.copy()
-    
-    # Apply filters one by one
-    if query:
-        q = query.lower()
-        filtered_results = [
-            entry for entry in filtered_results 
-            if q in json.dumps(entry, ensure_ascii=False).lower()
-        ]
-    
-    if manufacturer:
-        manufacturer_lower = manufacturer.lower()
-        filtered_results = [
-            entry for entry in filtered_results
-            if "Manufacturer" in entry and manufacturer_lower in entry["Manufacturer"].lower()
-        ]
-    
-    if min_price > 0 or max_price < float('inf'):
-        filtered_results = [
-            entry for entry in filtered_results
-            if "MRP" in entry and entry["MRP"] and min_price <= float(entry["MRP"]) <= max_price
-        ]
-    
-    if prescription_required is not None:
-        req_value = "Yes" if prescription_required else "No"
-        filtered_results = [
-            entry for entry in filtered_results
-            if "Prescription" in entry and entry["Prescription"] == req_value
-        ]
-    
-    if ingredient:
-        ingredient_lower = ingredient.lower()
-        filtered_results = [
-            entry for entry in filtered_results
-            if "Composition" in entry and ingredient_lower in entry["Composition"].lower()
-        ]
-    
-    # Calculate pagination
-    total_results = len(filtered_results)
-    total_pages = math.ceil(total_results / page_size)
-    
-    if page > total_pages and total_pages > 0:
-        page = total_pages
+    result = search_page(catalogue, query, page, page_size, manufacturer, min_price, max_price,
+                         prescription_required, ingredient, cursor)
+    if isinstance(result, str):
+        return result
     
-    start_idx = (page - 1) * page_size
-    end_idx = start_idx + page_size
-    
-    paginated_results = filtered_results[start_idx:end_idx]
-    
-    result = {
-        "meta": {
-            "total_results": total_results,
-            "page": page,
-            "page_size": page_size,
-            "total_pages": total_pages
-        },
-        "results": [format_medicine(entry) for entry in paginated_results]
-    }
-    
-    return json.dumps(result, ensure_ascii=False)
+    return json_response(result, len(result["results"]))
 
-@mcp.tool()
+@tool()
 def analyze_composition(composition: str) -> str:
     """
     Analyze a medicine composition string to extract and structure the ingredients.
@@ -677,60 +1262,30 @@ def analyze_composition(composition: str) -> str:
     Returns:
         JSON-encoded structured analysis of the composition.
     """
+    cat = catalogue
     if not composition:
         return "Please provide a composition string to analyze."
     
     result = {
         "raw_composition": composition,
-        "ingredients": []
+        "canonical_key": canonical_composition(composition),
+        "ingredients": parse_composition(composition)
     }
     
-    components = composition.split("+")
-    for component in components:
-        component = component.strip()
-        
-        # Try to extract ingredient name and dosage
-        name_match = re.search(r"([\w\s-]+)\s*\(", component)
-        dosage_match = re.search(r"\(([\w\s\d\.\/]+)\)", component)
-        
-        ingredient = {
-            "raw_text": component,
-        }
-        
-        if name_match:
-            ingredient["name"] = name_match.group(1).strip()
-        else:
-            ingredient["name"] = component
-            
-        if dosage_match:
-            ingredient["dosage"] = dosage_match.group(1).strip()
-            
-            # Try to further parse the dosage
-            dosage = ingredient["dosage"]
-            value_match = re.search(r"(\d+(?:\.\d+)?)", dosage)
-            unit_match = re.search(r"(\d+(?:\.\d+)?)\s*([a-zA-Z]+)", dosage)
-            
-            if value_match:
-                ingredient["dosage_value"] = value_match.group(1)
-                
-            if unit_match:
-                ingredient["dosage_unit"] = unit_match.group(2)
-        
-        result["ingredients"].append(ingredient)
-    
     # Add similar medicines with this composition
-    medicines_with_comp = []
-    for entry in medicines:
-        if "Composition" in entry and composition == entry["Composition"]:
-            medicines_with_comp.append(format_medicine(entry))
+    medicines_with_comp = [
+        cat.formatted(record_id)
+        for record_id in cat.canonical_index.get(result["canonical_key"])[:5]
+    ]
     
     if medicines_with_comp:
         result["medicines_with_this_composition"] = medicines_with_comp[:5]
     
-    return json.dumps(result, ensure_ascii=False)
+    return json_response(result, 1)
 
-@mcp.tool()
-def count_medicines_by_composition(composition: str, exact_match: bool = False) -> str:
+@tool()
+def count_medicines_by_composition(composition: str, exact_match: bool = False, mode: str = "full",
+                                   page: int = 1, page_size: int = 50) -> str:
     """
     Count and list all medicines with a specific composition or containing specific ingredients.
     
@@ -738,47 +1293,51 @@ def count_medicines_by_composition(composition: str, exact_match: bool = False)
         composition: The composition or ingredient to search for.
         exact_match: If True, only find medicines with the exact composition.
                      If False, find medicines containing this ingredient.
+        mode: "full" lists every medicine, also grouped by manufacturer.
+              "summary" returns only the counts and price statistics.
+              "paged" lists one page of medicines (cheapest first) with
+              per-manufacturer counts.
+        page: Page number (starting from 1) in "paged" mode.
+        page_size: Number of medicines per page in "paged" mode.
         
     Returns:
         JSON-encoded count and list of medicines with pricing information.
     """
-    results = []
+    if mode not in ("full", "summary", "paged"):
+        return f"Unknown mode: '{mode}'. Use 'full', 'summary' or 'paged'."
+    
+    cat = catalogue
     composition_lower = composition.lower()
     
-    # Process exact matches first
+    # Process exact matches first (same ingredients and strengths in any
+    # order, case or spacing)
     if exact_match:
-        for entry in medicines:
-            if "Composition" in entry and entry["Composition"] == composition:
-                results.append(entry)
+        record_ids = cat.substitute_record_ids(composition)
     else:
         # Process partial matches (contains the ingredient)
-        for entry in medicines:
-            if "Composition" in entry and composition_lower in entry["Composition"].lower():
-                results.append(entry)
+        record_ids = cat.composition_record_ids(composition_lower)
+    record_ids = np.asarray(record_ids, dtype=np.int64)
     
-    if not results:
+    if not len(record_ids):
         if exact_match:
             return f"No medicines found with the exact composition: '{composition}'."
         else:
             return f"No medicines found containing: '{composition}'."
     
-    # Group by manufacturer for better analysis
-    manufacturers = defaultdict(list)
-    for entry in results:
-        if "Manufacturer" in entry:
-            manufacturers[entry["Manufacturer"]].append(entry)
-        else:
-            manufacturers["Unknown"].append(entry)
-    
-    # Price analysis
-    prices = []
-    for entry in results:
-        if "MRP" in entry:
-            try:
-                price = float(entry["MRP"])
-                prices.append(price)
-            except (ValueError, TypeError):
-                continue
+    # Count by manufacturer for better analysis, in order of first appearance
+    # in the catalogue
+    manufacturer_ids, first_positions, counts = np.unique(
+        cat.manufacturer_id_array[record_ids], return_index=True, return_counts=True
+    )
+    manufacturer_counts = {}
+    for group in np.argsort(first_positions).tolist():
+        manufacturer_id = int(manufacturer_ids[group])
+        manufacturer = cat.manufacturer_index.keys[manufacturer_id] if manufacturer_id >= 0 else "Unknown"
+        manufacturer_counts[manufacturer] = manufacturer_counts.get(manufacturer, 0) + int(counts[group])
+    
+    # Price analysis (records without a valid MRP have a NaN price)
+    prices = cat.price_array[record_ids]
+    prices = prices[~np.isnan(prices)].tolist()
     
     price_stats = {}
     if prices:
@@ -789,29 +1348,60 @@ def count_medicines_by_composition(composition: str, exact_match: bool = False)
             "total_medicines_with_price": len(prices)
         }
     
-    # Sort medicines by price for easy comparison
-    if prices:
-        results.sort(key=lambda x: float(x["MRP"]) if "MRP" in x and x["MRP"] else float('inf'))
-    
     response = {
         "query": composition,
         "exact_match": exact_match,
-        "total_medicines_found": len(results),
-        "total_manufacturers": len(manufacturers),
-        "price_statistics": price_stats,
-        "medicines": [format_medicine(entry) for entry in results],
-        "by_manufacturer": {
+        "total_medicines_found": len(record_ids),
+        "total_manufacturers": len(manufacturer_counts),
+        "price_statistics": price_stats
+    }
+    
+    if mode == "full":
+        # Group by manufacturer (catalogue order within each group)
+        manufacturers = defaultdict(list)
+        for record_id in record_ids.tolist():
+            manufacturer_id = cat.record_manufacturer_ids[record_id]
+            if manufacturer_id >= 0:
+                manufacturers[cat.manufacturer_index.keys[manufacturer_id]].append(record_id)
+            else:
+                manufacturers["Unknown"].append(record_id)
+        # Medicines listed by price for easy comparison
+        results = cat.cheapest(record_ids, len(record_ids)).tolist()
+        response["medicines"] = [cat.formatted(record_id) for record_id in results]
+        response["by_manufacturer"] = {
             manufacturer: {
-                "count": len(entries),
-                "medicines": [format_medicine(entry) for entry in entries]
+                "count": len(record_ids),
+                "medicines": [cat.formatted(record_id) for record_id in record_ids]
             }
-            for manufacturer, entries in manufacturers.items()
+            for manufacturer, record_ids in manufacturers.items()
         }
+        return json_response(response, len(results))
+    
+    # A summary counts its manufacturer groups, a page its medicines
+    returned = len(manufacturer_counts)
+    if mode == "paged":
+        # Only the records up to the requested page are ordered by price, and
+        # only the page is formatted, so the response stays bounded
+        if page_size < 1:
+            page_size = 50
+        total_pages = math.ceil(len(record_ids) / page_size)
+        page = min(max(page, 1), total_pages)
+        start_idx = (page - 1) * page_size
+        page_ids = cat.cheapest(record_ids, start_idx + page_size)[start_idx:].tolist()
+        response["page"] = page
+        response["page_size"] = page_size
+        response["total_pages"] = total_pages
+        response["medicines"] = [cat.formatted(record_id) for record_id in page_ids]
+        returned = len(response["medicines"])
+    
+    response["by_manufacturer"] = {
+        manufacturer: {"count": count}
+        for manufacturer, count in manufacturer_counts.items()
     }
     
-    return json.dumps(response, ensure_ascii=False)
+    return json_response(response, returned)
 
-@mcp.tool()
+@tool()
 def categorize_medicines(max_categories: int = 10) -> str:
     """
     Categorize medicines by active ingredients and return the most common categories.
@@ -822,32 +1412,21 @@ def categorize_medicines(max_categories: int = 10) -> str:
     Returns:
         JSON-encoded categories with example medicines.
     """
-    # Create categories based on ingredients
-    categories = defaultdict(list)
-    
-    for entry in medicines:
-        if "Composition" in entry:
-            ingredients = extract_ingredients(entry["Composition"])
-            
-            # Use the first ingredient as the primary category
-            if ingredients:
-                primary_ingredient = ingredients[0]
-                categories[primary_ingredient].append(entry)
-    
-    # Get the most common categories
-    top_categories = sorted(categories.items(), key=lambda x: len(x[1]), reverse=True)[:max_categories]
+    cat = catalogue
+    # Categories (by primary ingredient) are ranked once per dataset generation
+    top_categories = cat.categories[:max_categories]
     
     result = []
-    for category, entries in top_categories:
+    for category, medicine_count, example_ids in top_categories:
         result.append({
             "category": category,
-            "medicine_count": len(entries),
-            "example_medicines": [format_medicine(entry) for entry in entries[:3]]
+            "medicine_count": medicine_count,
+            "example_medicines": [cat.formatted(record_id) for record_id in example_ids]
         })
     
-    return json.dumps(result, ensure_ascii=False)
+    return json_response(result, len(result))
 
-@mcp.tool()
+@tool(offload=False)
 def get_all_manufacturers() -> str:
     """
     Get a list of all manufacturers in the database.
@@ -855,17 +1434,10 @@ def get_all_manufacturers() -> str:
     Returns:
         JSON-encoded list of manufacturers with medicine counts.
     """
-    result = [
-        {"name": manufacturer, "medicine_count": len(entries)}
-        for manufacturer, entries in manufacturer_index.items()
-    ]
-    
-    # Sort by medicine count (descending)
-    result.sort(key=lambda x: x["medicine_count"], reverse=True)
-    
-    return json.dumps(result, ensure_ascii=False)
+    # Sorted by medicine count (descending) when the snapshot is built
+    return json_response(catalogue.manufacturers_json, len(catalogue.manufacturer_index))
 
-@mcp.tool()
+@tool()
 def suggest_alternatives(medicine_name: str, max_suggestions: int = 5) -> str:
     """
     Suggest alternative medicines based on composition similarity and price.
@@ -877,92 +1449,376 @@ def suggest_alternatives(medicine_name: str, max_suggestions: int = 5) -> str:
     Returns:
         JSON-encoded list of alternative medicines with comparison data.
     """
-    reference = name_index.get(medicine_name)
-    if not reference:
-        # Try fuzzy match
-        best_match = None
-        best_score = 0
-        
-        for med_name in name_index:
-            score = similarity_score(medicine_name, med_name)
-            if score > best_score and score >= 0.8:
-                best_score = score
-                best_match = med_name
-                
-        if best_match:
-            reference = name_index[best_match]
-            medicine_name = best_match  # Update to the matched name
-        else:
-            return f"Medicine '{medicine_name}' not found."
+    result = medicine_alternatives(catalogue, medicine_name, max_suggestions)
+    return result if isinstance(result, str) else json_response(result, len(result["alternatives"]))
+
+@tool(cache=False)
+def get_medicines_by_names(names: List[str], include_alternatives: bool = True) -> str:
+    """
+    Look up several medicines in one call, e.g. every item of a cart or prescription.
     
-    if "Composition" not in reference:
-        return f"Cannot suggest alternatives - no composition data for '{medicine_name}'."
+    Args:
+        names: Medicine names; each is matched like get_medicine_by_name.
+        include_alternatives: Whether to include cheaper alternatives in results.
+        
+    Returns:
+        JSON-encoded per-item results (as get_medicine_by_name) or errors, in input order.
+    """
+    cat = catalogue
+    # Medicines with the same ingredients share one candidate scan
+    if include_alternatives:
+        shared_counts = batch_shared_counts(cat, names)
+    else:
+        shared_counts = None
+    result = resolve_batch(names, lambda name: medicine_details(cat, name, include_alternatives, shared_counts))
+    return result if isinstance(result, str) else json_response(result, result["found"])
+
+@tool(cache=False)
+def suggest_alternatives_batch(medicine_names: List[str], max_suggestions: int = 5) -> str:
+    """
+    Suggest alternatives for several medicines in one call.
     
-    if "MRP" not in reference:
-        return f"Cannot suggest alternatives - no price data for '{medicine_name}'."
+    Args:
+        medicine_names: Names of the reference medicines.
+        max_suggestions: Maximum number of alternatives to suggest per medicine.
+        
+    Returns:
+        JSON-encoded per-item results (as suggest_alternatives) or errors, in input order.
+    """
+    cat = catalogue
+    # Medicines with the same ingredients share one candidate scan; small
+    # requests are served from the ranking stored in the snapshot instead
+    if 0 <= max_suggestions <= ALTERNATIVES_TOP_K:
+        shared_counts = None
+    else:
+        shared_counts = batch_shared_counts(cat, medicine_names)
+    result = resolve_batch(medicine_names, lambda name: medicine_alternatives(cat, name, max_suggestions, shared_counts))
+    return result if isinstance(result, str) else json_response(result, result["found"])
+
+@tool(offload=False)
+def autocomplete(prefix: str, max_results: int = 10, rank_by: str = "popularity") -> str:
+    """
+    Suggest medicine names, ingredients and manufacturers starting with a
+    prefix, for typeahead search boxes.
     
-    try:
-        ref_price = float(reference["MRP"])
-    except (ValueError, TypeError):
-        return f"Cannot suggest alternatives - invalid price data for '{medicine_name}'."
+    Args:
+        prefix: What has been typed so far (case and spacing are ignored).
+        max_results: Maximum number of suggestions (at most 20).
+        rank_by: "popularity" (most medicines first) or "price" (lowest price first).
+        
+    Returns:
+        JSON-encoded list of suggestions with their type, medicine count and lowest price.
+    """
+    if not autocomplete_key(prefix):
+        return "Please provide at least 1 character to autocomplete."
+    if rank_by not in ("popularity", "price"):
+        return f"Unknown rank_by: '{rank_by}'. Use 'popularity' or 'price'."
+    
+    cat = catalogue
+    limit = max(0, min(max_results, AUTOCOMPLETE_TOP_K))
+    entries = [cat.autocomplete_entry(entry_id) for entry_id in cat.autocomplete_ids(prefix, limit, rank_by)]
+    return json_response(json.dumps(entries, ensure_ascii=False), len(entries))
+
+@tool(cache=False, offload=False)
+def reload_medicines(wait: bool = False, force: bool = False) -> str:
+    """
+    Reload the medicines JSON without restarting the server.
     
-    # Get medicines with similar composition
-    ref_ingredients = extract_ingredients(reference["Composition"])
-    if not ref_ingredients:
-        return f"Cannot suggest alternatives - unable to parse ingredients for '{medicine_name}'."
+    A reload costs about as much as a full snapshot build, whatever the size
+    of the edit: unchanged records reuse their search documents and formatted
+    JSON, but every index is reassembled over all records (record ids shift
+    when records are inserted or deleted). Expect seconds for a large
+    catalogue; the current generation keeps serving meanwhile.
     
-    alternatives = []
-    for entry in medicines:
-        if entry["Name"] == medicine_name:
-            continue  # Skip the reference medicine
-            
-        if "Composition" not in entry or "MRP" not in entry:
-            continue
-            
-        try:
-            entry_price = float(entry["MRP"])
-        except (ValueError, TypeError):
-            continue
-            
-        entry_ingredients = extract_ingredients(entry["Composition"])
-        
-        # Calculate ingredient similarity
-        set1 = set(ref_ingredients)
-        set2 = set(entry_ingredients)
-        
-        if not set2:
-            continue
-            
-        intersection = len(set1.intersection(set2))
-        union = len(set1.union(set2))
+    Args:
+        wait: Wait for the new catalogue generation; otherwise reload in the background.
+        force: Rebuild even if the JSON file has not changed.
         
-        if union > 0:
-            ingredient_similarity = intersection / union
-            if ingredient_similarity >= 0.5:  # At least 50% similar ingredients
-                # Calculate price difference percentage
-                price_diff_pct = ((entry_price - ref_price) / ref_price) * 100
-                
-                alternatives.append({
-                    "medicine": format_medicine(entry),
-                    "ingredient_similarity": ingredient_similarity,
-                    "price_difference_percentage": price_diff_pct,
-                    "price_comparison": "cheaper" if price_diff_pct < 0 else "more expensive",
-                    "absolute_price_difference": abs(entry_price - ref_price)
-                })
+    Returns:
+        JSON-encoded reload summary (when waiting) or reload status.
+    """
+    if wait:
+        try:
+            result = reload_catalogue(force)
+        except Exception as exc:
+            return f"Reload failed: {type(exc).__name__}: {exc}"
+        return json_response(json.dumps(result, ensure_ascii=False), 1)
+    
+    started = reload_in_background(force)
+    return json_response(json.dumps({
+        "started": started,
+        "dataset_version": catalogue.version,
+        **reload_status
+    }, ensure_ascii=False), 1)
+
+@tool(cache=False, offload=False)
+def get_cache_stats() -> str:
+    """
+    Report tool result cache usage, to help size the cache.
     
-    # Sort by similarity and then by price (cheaper first)
-    alternatives.sort(key=lambda x: (-x["ingredient_similarity"], x["absolute_price_difference"]))
+    Returns:
+        JSON-encoded hit/miss counters (overall and per tool), evictions and current size.
+    """
+    return json_response(json.dumps(result_cache.stats(), ensure_ascii=False), 1)
+
+@tool(cache=False, offload=False)
+def get_memory_usage() -> str:
+    """
+    Report the memory used by the server and by each catalogue structure.
+    
+    Returns:
+        JSON-encoded process memory, snapshot size and per-structure byte counts.
+    """
+    cat = catalogue
+    snapshot = cat.snapshot
+    structures = cat.memory_usage()
+    snapshot_bytes = len(snapshot.buffer)
     
     result = {
-        "reference_medicine": format_medicine(reference),
-        "alternatives": alternatives[:max_suggestions]
+        "total_medicines": cat.record_count,
+        "process": process_memory(),
+        "snapshot": {
+            "path": snapshot.path,
+            "memory_mapped": isinstance(snapshot.buffer, mmap.mmap),
+            "bytes": snapshot_bytes,
+            "bytes_per_medicine": round(snapshot_bytes / cat.record_count, 1) if cat.record_count else None
+        },
+        "structures": structures,
+        "workers": worker_pool.stats()
     }
     
-    if not alternatives:
-        result["message"] = f"No suitable alternatives found for '{medicine_name}'."
+    if prefork_parent is not None:
+        # Every pre-fork worker, to compare their shared and private pages
+        result["prefork_workers"] = {pid: process_memory(pid) for pid in prefork_worker_pids()}
+    
+    return json_response(json.dumps(result, ensure_ascii=False), 1)
+
+@tool(cache=False, offload=False)
+def configure_profiling(tools: Optional[List[str]] = None, sample_rate: float = 0.0,
+                        trace_memory: bool = False, reset: bool = False) -> str:
+    """
+    Switch profiling of tool calls on or off at runtime. Profiled calls run
+    under cProfile (and tracemalloc with trace_memory), which slows them down.
+    Calling with no arguments turns profiling off.
+    
+    Args:
+        tools: Tools to profile on every call.
+        sample_rate: Share of all other tool calls to profile (0.0-1.0).
+        trace_memory: Also record each profiled call's peak allocated bytes.
+        reset: Discard the profiles collected so far.
     
-    return json.dumps(result, ensure_ascii=False)
+    Returns:
+        JSON-encoded profiling settings now in effect.
+    """
+    tools = tools or []
+    unknown = [name for name in tools if name not in tool_functions]
+    if unknown:
+        return f"Unknown tools: {', '.join(unknown)}."
+    if not 0 <= sample_rate <= 1:
+        return "sample_rate must be between 0.0 and 1.0."
+    
+    profiler.configure(tools, sample_rate, trace_memory, reset)
+    return json_response(json.dumps(profiler.settings(), ensure_ascii=False), 1)
+
+@tool(cache=False, offload=False)
+def get_profile_report(tool_name: str = "", top: int = 20, sort: str = "self") -> str:
+    """
+    Report where profiled tool calls spend their time.
+    
+    Args:
+        tool_name: Only report this tool (default: every profiled tool).
+        top: Number of hot functions listed per tool.
+        sort: Rank functions by "self" time or "cumulative" time.
+    
+    Returns:
+        JSON-encoded per-tool profiled call counts, allocation peaks and hot functions.
+    """
+    if sort not in ("self", "cumulative"):
+        return f"Unknown sort: '{sort}'. Use 'self' or 'cumulative'."
+    
+    return json_response(json.dumps(profiler.report(tool_name, top, sort), ensure_ascii=False), 1)
+
+# ---------------------------------------------------------------------------
+# Metrics endpoint
+# ---------------------------------------------------------------------------
+# Helper function to escape a Prometheus label value
+def prometheus_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metrics() -> str:
+    """
+    Tool, cache, worker pool and catalogue metrics in the Prometheus text
+    format. With pre-forked workers each process reports its own counters
+    (see the pid label of medicines_process_info).
+    """
+    cat = catalogue
+    lines = tool_metrics.render()
+
+    def add(metric: str, description: str, samples: List[tuple], kind: str = "gauge"):
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{prometheus_label(label)}"' for key, label in labels.items())
+            lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+
+    cache = result_cache.stats()
+    add("medicines_cache_hits_total", "Tool result cache hits.", [({}, cache["hits"])], "counter")
+    add("medicines_cache_misses_total", "Tool result cache misses.", [({}, cache["misses"])], "counter")
+    add("medicines_cache_entries", "Tool results currently cached.", [({}, cache["entries"])])
+    add("medicines_cache_bytes", "Size of the cached tool results.", [({}, cache["bytes"])])
+
+    workers = worker_pool.stats()
+    add("medicines_worker_in_flight", "Tool calls running in the worker pool.", [({}, workers["in_flight"])])
+    add("medicines_worker_rejected_total", "Tool calls turned away because the worker queue was full.",
+          [({}, workers["rejected"])], "counter")
+
+    last_reload = reload_status["last_reload"] or {}
+    add("medicines_process_info", "Serving process.",
+          [({"pid": os.getpid(), "worker_mode": WORKER_MODE}, 1)])
+    add("medicines_dataset_info", "Catalogue generation being served.",
+          [({"version": cat.version, "snapshot_format": SNAPSHOT_FORMAT_VERSION}, 1)])
+    add("medicines_dataset_modified_timestamp_seconds", "Modification time of the source JSON.",
+          [({}, cat.snapshot.source[0] / 1e9 if cat.snapshot.source else 0)])
+    add("medicines_last_reload_seconds", "Time taken by the last reload.",
+          [({}, last_reload.get("seconds", 0))])
+    add("medicines_records", "Medicines in the catalogue.", [({}, cat.record_count)])
+    add("medicines_index_keys", "Distinct keys per lookup index.", [
+        ({"index": name}, len(getattr(cat, name)))
+        for name in ("name_index", "name_alphabet", "manufacturer_index", "composition_index",
+                     "canonical_index", "ingredient_index", "token_index", "autocomplete_keys")
+    ])
+    add("medicines_index_bytes", "Snapshot bytes per catalogue structure.",
+          [({"structure": name}, size) for name, size in cat.memory_usage().items()])
+    return "\n".join(lines) + "\n"
+
+
+# Typeahead calls over HTTP count towards the autocomplete tool's metrics
+timed_autocomplete = tool_metrics.instrument(autocomplete)
+
+
+@mcp.custom_route("/autocomplete", methods=["GET"])
+async def autocomplete_endpoint(request) -> Response:
+    """
+    Typeahead over plain HTTP for web clients: GET /autocomplete?q=para&limit=10&rank_by=price
+    returns the autocomplete tool's suggestions, or a 400 with an "error" message.
+    """
+    try:
+        limit = int(request.query_params.get("limit", "10"))
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        return JSONResponse({"error": "limit must be a non-negative integer."}, status_code=400)
+
+    result = timed_autocomplete(request.query_params.get("q", ""), limit, request.query_params.get("rank_by", "popularity"))
+    if not result.startswith("["):
+        return JSONResponse({"error": result}, status_code=400)
+    return Response(result, media_type="application/json")
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request) -> PlainTextResponse:
+    """Prometheus scrape endpoint, served next to the MCP HTTP transport."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# ---------------------------------------------------------------------------
+# Pre-fork serving
+# ---------------------------------------------------------------------------
+# Pid of the pre-fork parent, inherited by its workers (None when not pre-forked)
+prefork_parent: Optional[int] = None
+
+
+def prefork_worker_pids() -> List[int]:
+    """Pids of the pre-fork parent's workers (Linux only; empty elsewhere)."""
+    try:
+        with open(f"/proc/{prefork_parent}/task/{prefork_parent}/children") as f:
+            return [int(pid) for pid in f.read().split()]
+    except (OSError, ValueError):
+        return []
+
+
+def prepare_for_fork(cat: Catalogue):
+    """
+    Make the loaded catalogue copy-on-write friendly before forking. Its bulk
+    already lives in the snapshot mapping, which has no reference counts and
+    is shared through the page cache. Structures otherwise built lazily are
+    built once here, and the remaining Python objects are moved out of the
+    garbage collector's reach (gc.freeze), so collections in the workers do
+    not write to, and so copy, the parent's pages.
+    """
+    for name in ("manufacturer_index", "prescription_index", "price_buckets"):
+        cat.index_bitmaps(name)
+    gc.collect()
+    gc.freeze()
+
+
+def start_watcher():
+    if WATCH_INTERVAL_SECONDS > 0:
+        threading.Thread(target=watch_catalogue, args=(WATCH_INTERVAL_SECONDS,), name="catalogue-watcher", daemon=True).start()
+
+
+def serve_prefork(workers: int, port: int):
+    """
+    Bind the HTTP port, then fork `workers` processes that accept on the
+    shared socket with the catalogue already loaded. Each worker reloads on
+    its own (use MEDICINES_WATCH_INTERVAL_SECONDS so they all follow the JSON).
+    """
+    global prefork_parent
+    import signal
+    import socket
+    import uvicorn
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((mcp.settings.host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Consecutive requests of one client may reach different workers, so no
+    # session state may live in a worker
+    mcp.settings.stateless_http = True
+    prepare_for_fork(catalogue)
+    prefork_parent = os.getpid()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            start_watcher()
+            config = uvicorn.Config(mcp.streamable_http_app(), log_level=mcp.settings.log_level.lower())
+            uvicorn.Server(config).run(sockets=[sock])
+            os._exit(0)
+        pids.append(pid)
+    logger.info("Serving on port %d with %d pre-forked workers: %s", port, workers, pids)
+
+    def stop(signum, frame):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for pid in pids:
+        while True:
+            try:
+                os.waitpid(pid, 0)
+                break
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+
 
 if __name__ == "__main__":
+    if "--build-snapshot" in sys.argv[1:]:
+        # The import above already (re)built the snapshot if it was stale
+        print(f"Snapshot {SNAPSHOT_PATH} is current ({catalogue.record_count} medicines)")
+        sys.exit(0)
+    
     # 4) Run over HTTP for integration with other services
-    mcp.run(transport="http", port=8001)
+    if PREFORK_WORKERS > 1:
+        serve_prefork(PREFORK_WORKERS, HTTP_PORT)
+    else:
+        start_watcher()
+        mcp.run(transport="http", port=HTTP_PORT)
@@ -0,0 +1,196 @@
+"""
+Tests of the catalogue engine against small synthetic catalogues (see conftest.py).
+"""
+import json
+import math
+from array import array
+import random
+
+import numpy as np
+import pytest
+
+import engine
+
+
+@pytest.fixture(scope="module")
+def catalogue():
+    return engine.load_catalogue(engine.DATA_PATH, engine.SNAPSHOT_PATH)
+
+
+# Fuzzy name search -------------------------------------------------------------
+
+def full_scan(cat, query: str, threshold: float):
+    """similarity_score against every name, best first (ties in first-occurrence order)."""
+    scored = [(engine.similarity_score(query, name), name) for name in cat.name_index.keys]
+    matches = [match for match in scored if match[0] >= threshold]
+    matches.sort(key=lambda match: match[0], reverse=True)
+    return matches
+
+
+def fuzzy_queries(cat):
+    rng = random.Random(7)
+    names = list(cat.name_index.keys)
+    queries = ["", "ab", "x" * 80, "Paracetamol 500mg tablet with a suffix long enough to pass 63 characters", "ÉCRAN"]
+    for name in rng.sample(names, 12):
+        position = rng.randrange(len(name))
+        queries.append(name[:position] + rng.choice("xqz ") + name[position + 1:])
+        queries.append(name[:rng.randint(3, len(name))])
+    return queries
+
+
+@pytest.mark.parametrize("threshold", [0.3, 0.6, 0.8])
+def test_fuzzy_name_matches_equal_full_scan(catalogue, threshold):
+    for query in fuzzy_queries(catalogue):
+        expected = full_scan(catalogue, query, threshold)
+        assert catalogue.fuzzy_name_matches(query, threshold) == expected, query
+        for limit in (1, 10):
+            assert catalogue.fuzzy_name_matches(query, threshold, limit) == expected[:limit], (query, limit)
+
+
+def test_closest_name_is_best_full_scan_match(catalogue):
+    for query in fuzzy_queries(catalogue):
+        expected = full_scan(catalogue, query, 0.8)
+        assert catalogue.closest_name(query) == (expected[0][1] if expected else None), query
+
+
+# Snapshot storage ----------------------------------------------------------------
+
+def test_snapshot_writer_round_trip():
+    writer = engine.SnapshotWriter()
+    writer.add_array("prices", "d", [1.5, float("nan"), 0.0])
+    writer.add_array("ids", "i", [3, -1, 7])
+    writer.add_strings("names", ["Dolo 650", "", "Crème\nline two", "ß"])
+    writer.add_ragged("lists", [[1, 2], [], [5]])
+    writer.add_postings("sorted", {"b": [2], "a": [0, 1]})
+    writer.add_postings("ordered", {"b": [2], "a": [0, 1]}, keep_order=True)
+    snapshot = engine.Snapshot(writer.to_bytes([123, 456]))
+
+    assert snapshot.source == [123, 456]
+    prices = snapshot.array("prices")
+    assert prices[0] == 1.5 and prices[1] != prices[1] and prices[2] == 0.0
+    assert list(snapshot.array("ids")) == [3, -1, 7]
+    assert list(snapshot.strings("names")) == ["Dolo 650", "", "Crème\nline two", "ß"]
+    lists = snapshot.ragged("lists")
+    assert [list(lists[i]) for i in range(len(lists))] == [[1, 2], [], [5]]
+    assert [(key, list(ids)) for key, ids in snapshot.postings("sorted").items()] == [("a", [0, 1]), ("b", [2])]
+    assert [(key, list(ids)) for key, ids in snapshot.postings("ordered").items()] == [("b", [2]), ("a", [0, 1])]
+    assert list(snapshot.postings("ordered")["a"]) == [0, 1]
+
+
+def test_snapshot_rejects_other_formats(monkeypatch):
+    with pytest.raises(ValueError, match="not a medicines snapshot"):
+        engine.Snapshot(b"not a snapshot at all")
+    monkeypatch.setattr(engine, "SNAPSHOT_FORMAT_VERSION", engine.SNAPSHOT_FORMAT_VERSION - 1)
+    older = engine.SnapshotWriter().to_bytes(None)
+    monkeypatch.undo()
+    with pytest.raises(ValueError, match="incompatible snapshot format"):
+        engine.Snapshot(older)
+
+
+def test_catalogue_round_trip(medicines, build_catalogue, tmp_path):
+    medicines[0]["Pack"] = {"units": 10, "note": "strip\nof ten"}
+    medicines[1] = {"Name": "Only A Name"}
+    medicines[2]["MRP"] = 42
+    medicines[3]["MRP"] = "N/A"
+    medicines[4]["Composition"] = "Paracétamol (500mg)"
+    cat = build_catalogue(medicines)
+
+    # Served from the memory-mapped file, not the buffer it was built in
+    assert cat.snapshot.path == str(tmp_path / "medicines.snapshot")
+    assert cat.record_count == len(medicines)
+    for record_id, medicine in enumerate(medicines):
+        assert list(cat.record(record_id).items()) == list(medicine.items())
+        assert json.loads(cat.formatted(record_id)) == engine.format_medicine(medicine)
+
+    reopened = engine.Catalogue(engine.open_snapshot(str(tmp_path / "medicines.snapshot")))
+    assert reopened.version == cat.version
+    assert [reopened.record(i) for i in range(reopened.record_count)] == medicines
+
+
+def test_load_catalogue_rebuilds_stale_or_corrupt_snapshots(medicines, build_catalogue, tmp_path):
+    build_catalogue(medicines)
+    data_path, snapshot_path = str(tmp_path / "medicines.json"), str(tmp_path / "medicines.snapshot")
+    assert engine.load_catalogue(data_path, snapshot_path).record_count == len(medicines)
+
+    with open(snapshot_path, "wb") as f:
+        f.write(b"garbage")
+    assert engine.open_snapshot(snapshot_path) is None
+    cat = engine.load_catalogue(data_path, snapshot_path)
+    assert cat.record(5) == medicines[5]
+    assert engine.open_snapshot(snapshot_path) is not None
+
+
+# Query plans -------------------------------------------------------------------
+
+def test_plan_cache_is_bounded_by_size():
+    plans = engine.PlanCache(64, 10_000)
+    for query in "abcdef":
+        plans.put(query, array("i", range(1000)))
+    assert plans.bytes <= 10_000 and len(plans.entries) == 2
+    assert plans.get("a") is None and plans.get("f") is not None
+
+    plans.put("huge", array("i", range(10_000)))
+    assert plans.get("huge") is None
+
+
+def test_plans_are_cached_per_generation(medicines, build_catalogue):
+    old = build_catalogue(medicines)
+    assert list(engine.plan_search(old, "zyqxor", "", 0.0, float("inf"), None, "")) == []
+
+    medicines[3]["Name"] = "Zyqxor 500 Tablet"
+    new = build_catalogue(medicines, old)
+    assert not new.plans.entries
+    assert list(engine.plan_search(new, "zyqxor", "", 0.0, float("inf"), None, "")) == [3]
+
+
+# Prices ------------------------------------------------------------------------
+
+ODD_PRICES = ["10000000", "inf", "-inf", "nan", "Infinity", "1e300", 0, "0", "", None, "N/A", "-5", 99.999]
+
+PRICE_RANGES = [(0, float("inf")), (0, 10), (99.5, 100), (100, 199.99), (250, 300), (-10, 3),
+                (50, 10_000_000), (10_000_000, float("inf")), (0, 1e301), (300, 200)]
+
+
+def priced_within(cat, low: float, high: float):
+    return [record_id for record_id, price in enumerate(cat.record_prices)
+            if math.isfinite(price) and low <= price <= high]
+
+
+def test_outlier_and_non_finite_prices(medicines, build_catalogue):
+    for position, price in enumerate(ODD_PRICES):
+        medicines[position * 7]["MRP"] = price
+    cat = build_catalogue(medicines)
+
+    # Non-finite prices are left out of the price column and every price filter
+    assert all(math.isfinite(price) for price in cat.price_column)
+    assert len(cat.index_bitmaps("price_buckets")) < 100
+    for low, high in PRICE_RANGES:
+        assert list(cat.bitmap_ids(cat.price_bitmap(low, high))) == priced_within(cat, low, high), (low, high)
+        assert sorted(cat.price_range_ids(low, high)) == priced_within(cat, low, high), (low, high)
+
+    statistics = json.loads(cat.statistics_json)["price_distribution"]
+    assert statistics["max_price"] == "₹inf"
+    assert all("inf" not in price_range for price_range in statistics["price_ranges"])
+
+    # Alternatives are only suggested at a finite price
+    for record_id in range(cat.record_count):
+        assert all(math.isfinite(cat.record_prices[i]) for i in cat.alternatives_top[record_id]), record_id
+
+    # Listed by price, records without a usable MRP (including infinite ones) go last
+    listed = cat.cheapest(np.arange(cat.record_count), cat.record_count).tolist()
+    usable = [record_id for record_id in listed if math.isfinite(cat.record_prices[record_id])
+              and (cat.record_prices[record_id] or medicines[record_id]["MRP"])]
+    assert listed[:len(usable)] == sorted(usable, key=lambda record_id: cat.record_prices[record_id])
+    assert listed[len(usable):] == sorted(listed[len(usable):])
+    assert listed[:3] == cat.cheapest(np.arange(cat.record_count), 3).tolist()
+
+
+def test_price_buckets_are_capped(medicines, build_catalogue):
+    # Every record in its own 100-rupee band
+    for position, medicine in enumerate(medicines):
+        medicine["MRP"] = f"{position * 1000 + 0.5:.2f}"
+    cat = build_catalogue(medicines)
+
+    assert len(cat.index_bitmaps("price_buckets")) == engine.PRICE_BUCKET_LIMIT
+    for low, high in PRICE_RANGES + [(255_000, 300_000), (1000, 1_999_000)]:
+        assert list(cat.bitmap_ids(cat.price_bitmap(low, high))) == priced_within(cat, low, high), (low, high)
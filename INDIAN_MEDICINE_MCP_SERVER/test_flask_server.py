@@ -0,0 +1,40 @@
+"""
+Tests of the REST API over the synthetic catalogue of conftest.py.
+"""
+import json
+import shutil
+
+import pytest
+
+import flask_server
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """A test client serving a private copy of the catalogue JSON."""
+    data_path = str(tmp_path / "medicines.json")
+    shutil.copyfile(flask_server.DATA_PATH, data_path)
+    monkeypatch.setattr(flask_server, "DATA_PATH", data_path)
+    monkeypatch.setattr(flask_server, "SNAPSHOT_PATH", str(tmp_path / "medicines.snapshot"))
+    monkeypatch.setattr(flask_server, "catalogue", flask_server.catalogue)
+    monkeypatch.setattr(flask_server, "catalogue_stamp", flask_server.source_stamp(data_path))
+    return flask_server.app.test_client()
+
+
+def test_cursor_is_rejected_after_the_json_changes(client):
+    first = client.get("/paginated_search", query_string={"query": "tablet", "page_size": 5}).get_json()
+    cursor = first["meta"]["next_cursor"]
+    second = client.get("/paginated_search", query_string={"query": "tablet", "page_size": 5, "cursor": cursor})
+    assert second.status_code == 200 and second.get_json()["meta"]["page"] == 2
+
+    with open(flask_server.DATA_PATH, encoding="utf-8") as f:
+        medicines = json.load(f)
+    medicines[0]["Name"] = "Zyqxor 500 Tablet"
+    with open(flask_server.DATA_PATH, "w", encoding="utf-8") as f:
+        json.dump(medicines, f, ensure_ascii=False)
+
+    stale = client.get("/paginated_search", query_string={"query": "tablet", "page_size": 5, "cursor": cursor})
+    assert stale.status_code == 400
+    assert stale.get_json() == {"error": "Invalid or expired cursor. Repeat the search without a cursor."}
+    found = client.get("/paginated_search", query_string={"query": "zyqxor"}).get_json()
+    assert [medicine["Name"] for medicine in found["results"]] == ["Zyqxor 500 Tablet"]
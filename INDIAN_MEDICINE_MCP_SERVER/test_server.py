@@ -0,0 +1,120 @@
+"""
+Tests of the MCP server module over the synthetic catalogue of conftest.py.
+Tools are called as plain functions; reloads run against a private copy of
+the catalogue file.
+"""
+import json
+import shutil
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def reloadable(tmp_path, monkeypatch):
+    """
+    Point reloads at a copy of the catalogue JSON and return a function that
+    rewrites it and reloads; the served generation is restored afterwards.
+    """
+    data_path = str(tmp_path / "medicines.json")
+    shutil.copyfile(server.DATA_PATH, data_path)
+    monkeypatch.setattr(server, "DATA_PATH", data_path)
+    monkeypatch.setattr(server, "SNAPSHOT_PATH", str(tmp_path / "medicines.snapshot"))
+    monkeypatch.setattr(server, "catalogue", server.catalogue)
+
+    def rewrite_and_reload(edit):
+        with open(data_path, encoding="utf-8") as f:
+            medicines = json.load(f)
+        edit(medicines)
+        with open(data_path, "w", encoding="utf-8") as f:
+            json.dump(medicines, f, ensure_ascii=False)
+        return server.reload_catalogue()
+    return rewrite_and_reload
+
+
+def rename_first(name: str):
+    def edit(medicines):
+        medicines[0]["Name"] = name
+    return edit
+
+
+# Result cache --------------------------------------------------------------------
+
+def test_result_cache_drops_entries_when_the_dataset_version_changes():
+    version = ["v1"]
+    cache = server.ResultCache(16, 1 << 20, 0, lambda: version[0])
+    key = ("search_medicines", (("query", "dolo"),))
+    cache.put(key, "result", "v1")
+    assert cache.get(key) == "result"
+
+    version[0] = "v2"
+    assert cache.get(key) is None
+    stats = cache.stats()
+    assert (stats["entries"], stats["invalidations"], stats["dataset_version"]) == (0, 1, "v2")
+
+    # A result computed against the old generation is not cached under the new one
+    cache.put(key, "stale", "v1")
+    assert cache.get(key) is None
+
+
+def test_result_cache_limits():
+    cache = server.ResultCache(2, 1 << 20, 0, lambda: "v1")
+    for name in ("a", "b", "c"):
+        cache.put((name, ()), name, "v1")
+    assert cache.get(("a", ())) is None
+    assert cache.get(("c", ())) == "c"
+    assert cache.stats()["evictions"] == 1
+
+    cache = server.ResultCache(16, 100, 0, lambda: "v1")
+    cache.put(("big", ()), "x" * 200, "v1")
+    assert cache.get(("big", ())) is None
+
+
+def test_cached_tool_results_are_invalidated_by_a_reload(reloadable):
+    assert server.search_medicines("Zyqxor") == "No medicines found containing 'Zyqxor'."
+    invalidations = server.result_cache.stats()["invalidations"]
+
+    summary = reloadable(rename_first("Zyqxor 500 Tablet"))
+    assert summary["reloaded"] and summary["dataset_version"] == server.catalogue.version
+
+    found = json.loads(server.search_medicines("Zyqxor"))
+    assert [medicine["Name"] for medicine in found] == ["Zyqxor 500 Tablet"]
+    assert server.result_cache.stats()["invalidations"] == invalidations + 1
+
+
+# paginated_search cursors and query plans --------------------------------------
+
+def page(**arguments):
+    """The decoded page, or the text reply (such as a rejected cursor)."""
+    result = server.paginated_search(**arguments)
+    return json.loads(result) if isinstance(result, server.ToolResponse) else result
+
+
+def test_cursor_continues_a_search():
+    first = page(query="tablet", page_size=7)
+    second = page(query="tablet", page_size=7, cursor=first["meta"]["next_cursor"])
+    assert second["results"] == page(query="tablet", page_size=7, page=2)["results"]
+    assert second["meta"]["page"] == 2
+
+
+def test_cursor_is_rejected_for_other_filters_or_when_tampered():
+    cursor = page(query="tablet", page_size=7)["meta"]["next_cursor"]
+    expired = "Invalid or expired cursor. Repeat the search without a cursor."
+    assert page(query="syrup", page_size=7, cursor=cursor) == expired
+    assert page(query="tablet", page_size=7, max_price=100, cursor=cursor) == expired
+    assert page(query="tablet", page_size=7, cursor=cursor[:-2]) == expired
+    assert page(query="tablet", page_size=7, cursor="not a cursor") == expired
+
+
+def test_cursor_is_rejected_after_a_reload(reloadable):
+    cursor = page(query="tablet", page_size=7)["meta"]["next_cursor"]
+    assert not isinstance(page(query="tablet", page_size=7, cursor=cursor), str)
+
+    reloadable(rename_first("Zyqxor 500 Tablet"))
+    assert page(query="tablet", page_size=7, cursor=cursor) == (
+        "Invalid or expired cursor. Repeat the search without a cursor."
+    )
+    # A fresh search serves, and caches plans for, the new generation only
+    assert page(query="zyqxor")["meta"]["total_results"] == 1
+    assert server.catalogue.plans.entries